@@ -0,0 +1,180 @@
+import os
+import glob
+import time
+import argparse
+import traceback
+
+from pipeline_utils import DATA_ROOT
+from build_manifest import combine_digests
+from build_static_dynamic import OUT_DIR, PLY_DIR, STATIC_FRAME, Scene, run_pipeline
+from work_queue import JOB_LEASE_S, QUEUE_STATES, WorkQueue
+
+FRAMES_PER_JOB = 8
+
+# How long an idle `work --wait` sleeps before looking for new jobs.
+IDLE_POLL_S = 10.0
+
+
+def discover_scenes(patterns, ply_dir=PLY_DIR, data_root=DATA_ROOT, out_dir=OUT_DIR):
+    """
+    Scenes under the directories matching the glob patterns. A directory is
+    a scene when it has frames in ply_dir and cameras in data_root; others
+    are reported and skipped.
+    """
+    roots = sorted({os.path.abspath(p) for pattern in patterns for p in glob.glob(pattern)
+                    if os.path.isdir(p)})
+    scenes = []
+    for root in roots:
+        scene = Scene(root, ply_dir, data_root, out_dir)
+        if not scene.frames():
+            print("Skipping, no frames:", scene.ply_dir)
+        elif not (os.path.isfile(scene.rig_path) or os.path.isfile(scene.cam_cfg_path)):
+            print("Skipping, no cameras:", scene.data_root)
+        else:
+            scenes.append(scene)
+    return scenes
+
+
+def scene_jobs(scene, frames_per_job=FRAMES_PER_JOB, static_frame=STATIC_FRAME, options=None,
+               ply_dir=PLY_DIR, data_root=DATA_ROOT, out_dir=OUT_DIR):
+    """
+    Split a scene into (scene, frame-range) jobs. Returns [(job_id, job)].
+    The static frame falls back to the middle frame when the scene does not
+    have it. options: the run_pipeline flags that change outputs, fixed
+    here so every worker builds the scene the same way. A consensus scene
+    is one job, as its Static_Master depends on every frame.
+    """
+    frames = scene.frames()
+    if (options or {}).get("consensus"):
+        frames_per_job = len(frames)
+    if static_frame not in frames:
+        fallback = frames[len(frames) // 2]
+        print(f"{scene.root}: no frame {static_frame}, Static_Master from frame {fallback}")
+        static_frame = fallback
+
+    # The path digest keeps ids unique when scenes in different parents share a name.
+    name = f"{os.path.basename(scene.root)}-{combine_digests([scene.root])[:8]}"
+    jobs = []
+    for start in range(0, len(frames), frames_per_job):
+        chunk = frames[start:start + frames_per_job]
+        jobs.append((f"{name}_{chunk[0]:05d}-{chunk[-1]:05d}", {
+            "root": scene.root,
+            "ply_dir": ply_dir,
+            "data_root": data_root,
+            "out_dir": out_dir,
+            "frames": chunk,
+            "static_frame": static_frame,
+            "options": dict(options or {}),
+        }))
+    return jobs
+
+
+def enqueue(queue, patterns, frames_per_job=FRAMES_PER_JOB, static_frame=STATIC_FRAME, options=None,
+            ply_dir=PLY_DIR, data_root=DATA_ROOT, out_dir=OUT_DIR):
+    """Discover scenes and queue their jobs; jobs already known are left alone."""
+    scenes = discover_scenes(patterns, ply_dir, data_root, out_dir)
+    added = skipped = 0
+    for scene in scenes:
+        for job_id, job in scene_jobs(scene, frames_per_job, static_frame, options,
+                                      ply_dir, data_root, out_dir):
+            if queue.put(job_id, job):
+                added += 1
+            else:
+                skipped += 1
+    print(f"Queued {added} jobs from {len(scenes)} scenes ({skipped} already known)")
+
+
+def run_job(job, workers=1, prefetch=0, metrics_path=None, debug=False):
+    scene = Scene(job["root"], job["ply_dir"], job["data_root"], job["out_dir"])
+    return run_pipeline(workers=workers, metrics_path=metrics_path, debug=debug, prefetch=prefetch,
+                        scene=scene, frames=job["frames"], static_frame=job["static_frame"],
+                        **job["options"])
+
+
+def work(queue, max_jobs=None, wait=False, workers=1, prefetch=0, metrics_path=None, debug=False):
+    """
+    Claim and run jobs until the queue is drained (or max_jobs have run).
+    wait=True keeps polling for new jobs instead of exiting.
+    A failing job is moved to failed/ with its traceback; the worker goes on.
+    """
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        claimed = queue.claim()
+        if claimed is None:
+            if not wait:
+                break
+            time.sleep(IDLE_POLL_S)
+            continue
+
+        job_id, job = claimed
+        print(f"=== JOB {job_id}: {job['root']} frames {job['frames'][0]}-{job['frames'][-1]} ===")
+        error = None
+        with queue.heartbeat(job_id):
+            try:
+                if not run_job(job, workers, prefetch, metrics_path, debug):
+                    error = "static frame missing"
+            except Exception:
+                error = traceback.format_exc()
+                print(error)
+        queue.finish(job_id, job, error)
+        print(f"=== JOB {job_id}: {'FAILED' if error else 'done'} ===")
+        done += 1
+    print("Worker ran", done, "jobs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build many scenes through a lock-file work queue on a shared directory.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enqueue", help="discover scenes by glob and queue (scene, frame-range) jobs")
+    p.add_argument("queue", help="queue directory, shared by every worker")
+    p.add_argument("scenes", nargs="+", metavar="GLOB", help="scene root directories, e.g. 'captures/*'")
+    p.add_argument("--frames-per-job", type=int, default=FRAMES_PER_JOB)
+    p.add_argument("--static-frame", type=int, default=STATIC_FRAME,
+                   help=f"frame the Static_Master is taken from (default: {STATIC_FRAME}, "
+                        "or the middle frame when a scene lacks it)")
+    p.add_argument("--ply-dir", default=PLY_DIR)
+    p.add_argument("--data-root", default=DATA_ROOT)
+    p.add_argument("--out-dir", default=OUT_DIR)
+    p.add_argument("--stream", action="store_true")
+    p.add_argument("--cull", action="store_true")
+    p.add_argument("--footprint", action="store_true")
+    p.add_argument("--compress", action="store_true")
+    p.add_argument("--consensus", action="store_true")
+
+    p = sub.add_parser("work", help="claim and run jobs until the queue is drained")
+    p.add_argument("queue")
+    p.add_argument("--max-jobs", type=int, default=None)
+    p.add_argument("--wait", action="store_true", help="keep polling for new jobs instead of exiting")
+    p.add_argument("--lease", type=float, default=JOB_LEASE_S,
+                   help=f"seconds without a heartbeat before a claim is requeued (default: {JOB_LEASE_S})")
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--prefetch", type=int, default=0, metavar="DEPTH")
+    p.add_argument("--metrics", default=None, metavar="PATH")
+    p.add_argument("--debug", action="store_true")
+
+    p = sub.add_parser("status", help="count jobs per state")
+    p.add_argument("queue")
+
+    p = sub.add_parser("retry", help="move failed jobs back to pending")
+    p.add_argument("queue")
+
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        options = dict(stream=args.stream, cull=args.cull, footprint=args.footprint,
+                       compress=args.compress, consensus=args.consensus)
+        enqueue(WorkQueue(args.queue), args.scenes, args.frames_per_job, args.static_frame, options,
+                args.ply_dir, args.data_root, args.out_dir)
+    elif args.command == "work":
+        work(WorkQueue(args.queue, args.lease), args.max_jobs, args.wait, args.workers, args.prefetch,
+             args.metrics, args.debug)
+    elif args.command == "status":
+        queue = WorkQueue(args.queue)
+        counts = queue.counts()
+        print("  ".join(f"{state}: {counts[state]}" for state in QUEUE_STATES))
+        for job_id in queue.jobs("failed"):
+            print("failed:", job_id)
+    elif args.command == "retry":
+        print("Retrying", len(WorkQueue(args.queue).retry_failed()), "failed jobs")
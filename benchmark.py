@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+
+import numpy as np
+import imageio.v2 as imageio
+
+from gaussian_io import GAUSSIAN_DTYPE, load_ply_gaussians, save_compressed_ply, save_ply_gaussians
+from pipeline_utils import load_cameras, load_masks_for_frame, project_points
+from classify_splats import CameraShardPool, GridCache, ProjectionCache, classify_splats
+from mask_store import MaskStore, build_mask_archive
+from camera_rig import build_camera_rig, load_camera_rig
+
+IMAGE_SIZE = (2160, 3840)  # (H, W) of the synthetic cameras
+MASK_SIZE = (384, 640)     # (H, W) of the synthetic masks, as in dataset_v3
+
+
+# --------- Synthetic scene ---------
+
+def _look_at_c2w(center, target):
+    """C2W rotation (x right, y down, z forward), as stored in camera_config.json."""
+    f = target - center
+    f /= np.linalg.norm(f)
+    x = np.cross(f, [0.0, 0.0, 1.0])
+    x /= np.linalg.norm(x)
+    y = np.cross(f, x)
+    return np.stack([x, y, f], axis=1)
+
+
+def make_synthetic_scene(root, num_splats, num_cams=22, num_people=3, seed=0):
+    """
+    Write a synthetic capture under root:
+      scene.ply             num_splats Gaussians in GAUSSIAN_DTYPE layout
+      camera_config.json    num_cams cameras on a ring looking at the origin
+      masks/<cam>/000000.png person blobs where the people project
+    About 5% of the splats form num_people upright ellipsoid "people".
+    """
+    rng = np.random.default_rng(seed)
+    H, W = IMAGE_SIZE
+    Hm, Wm = MASK_SIZE
+
+    # People: upright ellipsoids standing near the origin.
+    people = np.c_[rng.uniform(-1.5, 1.5, (num_people, 2)), np.full(num_people, 0.9)]
+    person_radii = np.array([0.25, 0.25, 0.9])
+
+    n_people = num_splats // 20
+    n_background = num_splats - n_people
+
+    xyz = np.empty((num_splats, 3), dtype=np.float32)
+    xyz[:n_background] = rng.normal(0.0, [4.0, 4.0, 1.5], (n_background, 3))
+    owner = rng.integers(0, num_people, n_people)
+    xyz[n_background:] = people[owner] + rng.normal(0.0, 0.4, (n_people, 3)) * person_radii
+
+    g = np.zeros(num_splats, dtype=GAUSSIAN_DTYPE)
+    g["x"], g["y"], g["z"] = xyz.T
+    g["f_dc"] = rng.normal(0.0, 1.0, (num_splats, 3))
+    g["opacity"] = rng.normal(0.0, 2.0, num_splats)
+    g["scale"] = rng.uniform(-6.0, -2.0, (num_splats, 3))
+    q = rng.normal(size=(num_splats, 4))
+    g["rot"] = q / np.linalg.norm(q, axis=1, keepdims=True)
+    save_ply_gaussians(os.path.join(root, "scene.ply"), g)
+
+    # Cameras on a ring at eye height; R/T stored C2W like the real config.
+    cameras_cfg = []
+    focal = 0.8 * W
+    K = np.array([[focal, 0, W / 2], [0, focal, H / 2], [0, 0, 1]])
+    for c in range(num_cams):
+        angle = 2 * np.pi * c / num_cams
+        center = np.array([7.0 * np.cos(angle), 7.0 * np.sin(angle), 1.5])
+        R = _look_at_c2w(center, np.zeros(3))
+        folder = f"{c + 1:03d}001"
+        cameras_cfg.append({
+            "cam_index": c,
+            "image_name": f"{folder}.png",
+            "mask_folder": folder,
+            "width": W,
+            "height": H,
+            "K": K.tolist(),
+            "R": R.tolist(),
+            "T": center.tolist(),
+        })
+    cfg_path = os.path.join(root, "camera_config.json")
+    with open(cfg_path, "w") as f:
+        json.dump({"cameras": cameras_cfg}, f, indent=2)
+
+    # Masks: one filled ellipse per visible person.
+    yy, xx = np.mgrid[0:Hm, 0:Wm]
+    sx, sy = Wm / W, Hm / H
+    for cam in load_cameras(cfg_path):
+        uv, depth = project_points(cam.K, cam.R, cam.T, people)
+        m = np.zeros(MASK_SIZE, dtype=np.uint8)
+        for (u, v), d in zip(uv, depth):
+            if d <= 0:
+                continue
+            ru = person_radii[0] * focal / d * sx
+            rv = person_radii[2] * focal / d * sy
+            m[((xx - u * sx) / ru) ** 2 + ((yy - v * sy) / rv) ** 2 <= 1.0] = 255
+        folder = os.path.join(root, "masks", cam.mask_folder)
+        os.makedirs(folder, exist_ok=True)
+        imageio.imwrite(os.path.join(folder, "000000.png"), m)
+
+
+# --------- Timing ---------
+
+def _time(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"best_s": min(times), "mean_s": sum(times) / len(times)}
+
+
+def benchmark_scene(root, repeats=3):
+    """Time every pipeline stage on a scene written by make_synthetic_scene."""
+    ply_path = os.path.join(root, "scene.ply")
+    masks_dir = os.path.join(root, "masks")
+    cams = load_cameras(os.path.join(root, "camera_config.json"))
+
+    g = load_ply_gaussians(ply_path)
+    masks = load_masks_for_frame(0, cams, masks_dir=masks_dir)
+    xyz = np.stack([g["x"], g["y"], g["z"]], axis=-1)
+
+    archive_path = os.path.join(root, "masks_packed.bin")
+    build_mask_archive(cams, masks_dir=masks_dir, out_path=archive_path)
+
+    def mask_archive_load():
+        # Fresh store each time so the LRU cache does not hide the decode.
+        load_masks_for_frame(0, cams, store=MaskStore(archive_path))
+
+    rig_path = os.path.join(root, "camera_rig.npz")
+    build_camera_rig(cams, [m.shape for m in masks]).save(rig_path)
+    rig = load_camera_rig(rig_path)
+
+    def project_all():
+        for cam in cams:
+            project_points(cam.K, cam.R, cam.T, xyz)
+
+    def classify(**kwargs):
+        return classify_splats(g, cams, masks, thresh=1, **kwargs)
+
+    cache = ProjectionCache()
+    grids = GridCache()
+    shards = CameraShardPool(max(2, os.cpu_count() or 1))
+
+    out_path = os.path.join(root, "out.ply")
+    stages = {
+        "ply_load": lambda: load_ply_gaussians(ply_path),
+        "ply_load_mmap": lambda: load_ply_gaussians(ply_path, mmap_mode="r"),
+        "mask_load_png": lambda: load_masks_for_frame(0, cams, masks_dir=masks_dir),
+        "mask_load_archive": mask_archive_load,
+        "project_points": project_all,
+        "classify_splats": classify,
+        # Includes building the grid, as for the first frame of a run.
+        "classify_splats_cull": lambda: classify(cull=True),
+        # Refits the previous grid, as for every frame after the first.
+        "classify_splats_cull_grid_cache": lambda: classify(cull=True, grids=grids),
+        "camera_rig_load": lambda: load_camera_rig(rig_path),
+        "classify_splats_rig": lambda: classify(rig=rig),
+        "classify_splats_footprint": lambda: classify(footprint=True),
+        # Warm after the first repeat, as for every frame after the first.
+        "classify_splats_cached": lambda: classify(cache=cache),
+        "classify_splats_early_exit": lambda: classify(early_exit=True),
+        "classify_splats_sharded": lambda: classify(shards=shards),
+        "save_ply_gaussians": lambda: save_ply_gaussians(out_path, g),
+        "save_compressed_ply": lambda: save_compressed_ply(out_path, g),
+    }
+    with shards:
+        results = {name: _time(fn, repeats) for name, fn in stages.items()}
+
+    _, dynamic_mask = classify()
+    return {
+        "num_splats": int(g.shape[0]),
+        "num_cameras": len(cams),
+        "num_dynamic": int(np.count_nonzero(dynamic_mask)),
+        "stages": results,
+    }
+
+
+def run_benchmarks(splat_counts, repeats=3, work_dir=None, seed=0):
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "repeats": repeats,
+        "runs": [],
+    }
+    for n in splat_counts:
+        root = tempfile.mkdtemp(prefix=f"bench_{n}_", dir=work_dir)
+        try:
+            make_synthetic_scene(root, n, seed=seed)
+            report["runs"].append(benchmark_scene(root, repeats))
+        finally:
+            if work_dir is None:
+                shutil.rmtree(root, ignore_errors=True)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on synthetic scenes.")
+    parser.add_argument("--splats", type=int, nargs="+", default=[100_000, 1_000_000],
+                        help="splat counts to benchmark (default: 100000 1000000)")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default=None,
+                        help="keep the generated scenes here instead of a deleted temp dir")
+    parser.add_argument("--out", default=None, help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.splats, args.repeats, args.work_dir, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,96 @@
+import os
+import json
+import hashlib
+
+from work_queue import FileLock
+
+MANIFEST_NAME = "build_manifest.json"
+
+_HASH_BLOCK = 1 << 20
+
+
+def _digest_file(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(_HASH_BLOCK)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+def combine_digests(parts):
+    """Hash an ordered list of strings/bytes into one key."""
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        if isinstance(p, str):
+            p = p.encode("utf-8")
+        h.update(len(p).to_bytes(8, "little"))
+        h.update(p)
+    return h.hexdigest()
+
+
+class BuildManifest:
+    """
+    Records, per output target, the content key of the inputs it was built
+    from. Saved after every update so an interrupted run resumes where it
+    stopped.
+
+    File digests are cached by (size, mtime_ns), so unchanged inputs are
+    not re-read on the next run.
+
+    Several processes may build targets of the same output directory (see
+    batch_pipeline.py): saves are serialized by a lock file and merged with
+    what is on disk, so each process keeps the others' records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.targets = {}
+        self.files = {}
+        self._recorded = {}
+        self.refresh()
+
+    def refresh(self):
+        """Pick up targets recorded by other processes; this one's own records win."""
+        targets, files = {}, {}
+        if os.path.isfile(self.path):
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            targets = data.get("targets", {})
+            files = data.get("files", {})
+        targets.update(self._recorded)
+        files.update(self.files)
+        self.targets = targets
+        self.files = files
+
+    def file_digest(self, path):
+        st = os.stat(path)
+        cached = self.files.get(path)
+        if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+
+        digest = _digest_file(path)
+        self.files[path] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def is_current(self, target, key, outputs):
+        """True if target was built from key and all its outputs still exist."""
+        entry = self.targets.get(target)
+        if entry is None or entry["key"] != key:
+            return False
+        return all(os.path.isfile(p) for p in outputs)
+
+    def record(self, target, key, outputs):
+        self._recorded[target] = {"key": key, "outputs": list(outputs)}
+        self.targets[target] = self._recorded[target]
+        self.save()
+
+    def save(self):
+        with FileLock(self.path + ".lock"):
+            self.refresh()
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"targets": self.targets, "files": self.files}, f, indent=1)
+            os.replace(tmp_path, self.path)
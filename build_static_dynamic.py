@@ -1,99 +1,944 @@
 import os
+import re
+import glob
+import time
+import argparse
+import traceback
+import multiprocessing as mp
 import numpy as np
-from gaussian_io import load_ply_gaussians, save_ply_gaussians
-from pipeline_utils import load_cameras, load_masks_for_frame
-from classify_splats import classify_splats
+from gaussian_io import (
+    GaussianCloud,
+    PlyStreamWriter,
+    compressed_prefix,
+    concat_ply_files,
+    iter_ply_chunks,
+    load_ply_gaussians,
+    ply_vertex_count,
+    save_compressed_ply,
+    save_gaussian_sequence,
+    save_ply_gaussians,
+)
+from pipeline_utils import CAM_CFG_PATH, DATA_ROOT, MASKS_DIR, load_cameras, load_masks_for_frame
+from classify_splats import (
+    CONSENSUS_MAX_DYNAMIC,
+    STREAM_CHUNK,
+    CameraShardPool,
+    GridCache,
+    ProjectionCache,
+    StaticConsensus,
+    classify_ply_streaming,
+    classify_splats,
+)
+from mask_store import MASK_ARCHIVE_PATH, MaskStore
+from camera_rig import RIG_PATH, load_camera_rig, open_camera_rig
+from build_manifest import MANIFEST_NAME, BuildManifest, combine_digests
+from metrics import NULL_METRICS, make_metrics
+from prefetch import staged_map
+from work_queue import FileLock
 
 PLY_DIR = "0448_ply"
 OUT_DIR = "output_ply"
+THRESH = 1
+# Frame whose static splats become the Static_Master.
+STATIC_FRAME = 30
 
+# --watch: seconds between scans of the scene, and how long a frame's
+# files must have been left alone before it is read.
+WATCH_POLL_S = 1.0
+WATCH_SETTLE_S = 2.0
 
-def run_pipeline():
-    print("=== RUN_PIPELINE START ===")
+_FRAME_RE = re.compile(r"time_(\d+)\.ply$")
 
-    print("Loading cameras...")
-    cams = load_cameras()
-    print("Loaded", len(cams), "cameras")
-    
-    os.makedirs(OUT_DIR, exist_ok=True)
-    print("Output directory:", OUT_DIR)
+# Per-process state for --workers mode, filled once by _init_worker so the
+# cameras, rig and mask store are not pickled with every task.
+_WORKER_STATE = {}
+
+# Static_Master encoded once per process for --compress, keyed by its
+# (path, mtime_ns) so a rebuilt master is picked up.
+_STATIC_PREFIX = {}
+
+
+class Scene:
+    """
+    Where one capture's inputs and outputs live. Directories are relative to
+    root; the defaults are the single-scene layout in the working directory.
+    """
+
+    def __init__(self, root="", ply_dir=PLY_DIR, data_root=DATA_ROOT, out_dir=OUT_DIR):
+        self.root = root
+        self.ply_dir = os.path.join(root, ply_dir)
+        self.data_root = os.path.join(root, data_root)
+        self.out_dir = os.path.join(root, out_dir)
+        self.masks_dir = os.path.join(self.data_root, os.path.basename(MASKS_DIR))
+        self.cam_cfg_path = os.path.join(self.data_root, os.path.basename(CAM_CFG_PATH))
+        self.rig_path = os.path.join(self.data_root, os.path.basename(RIG_PATH))
+        self.mask_archive_path = os.path.join(self.data_root, os.path.basename(MASK_ARCHIVE_PATH))
+
+    def frames(self):
+        """Sorted indices of the time_XXXXX.ply frames present."""
+        frames = []
+        for path in glob.glob(os.path.join(glob.escape(self.ply_dir), "time_*.ply")):
+            m = _FRAME_RE.search(os.path.basename(path))
+            if m:
+                frames.append(int(m.group(1)))
+        return sorted(frames)
+
+    def frame_ply_path(self, i):
+        return os.path.join(self.ply_dir, f"time_{i:05d}.ply")
+
+    def frame_output_paths(self, i):
+        return (os.path.join(self.out_dir, f"Dynamic_{i:05d}.ply"),
+                os.path.join(self.out_dir, f"Final_{i:05d}.ply"))
+
+    def static_master_path(self):
+        return os.path.join(self.out_dir, "Static_Master.ply")
+
+    def sequence_path(self):
+        return os.path.join(self.out_dir, "Sequence.gseq")
+
+    def open_mask_store(self):
+        """
+        Use the packed mask archive when it has been built and no PNG has
+        changed or appeared since, else PNGs.
+        """
+        if not os.path.isfile(self.mask_archive_path):
+            return None
+        store = MaskStore(self.mask_archive_path)
+        stale = store.stale_pngs(self.masks_dir)
+        if stale:
+            print(f"[WARN] {len(stale)} mask PNGs are newer than {self.mask_archive_path} "
+                  f"(e.g. {stale[0]}); reading PNGs. Re-run mask_store.py to repack.")
+            return None
+        return store
+
+    def load_cameras(self):
+        """(rig, cams): the compiled rig and its cameras, or (None, camera_config.json)."""
+        rig = open_camera_rig(self.rig_path, self.cam_cfg_path)
+        if rig is not None:
+            return rig, rig.cameras()
+        return None, load_cameras(self.cam_cfg_path)
+
+
+DEFAULT_SCENE = Scene()
+
+
+def frame_inputs_key(manifest, i, cams, mask_store=None, rig=None, scene=DEFAULT_SCENE):
+    """
+    Content key over everything frame i's classification reads: the PLY,
+    one mask per camera, the cameras (camera_rig.npz when compiled, else
+    camera_config.json) and THRESH.
+    Masks are keyed by their PNGs whether or not they are read from the
+    packed archive, so editing a PNG rebuilds its frame and switching
+    between the two sources rebuilds nothing. Only a mask whose PNG is
+    gone is keyed by its packed bits.
+    """
+    parts = [
+        manifest.file_digest(scene.frame_ply_path(i)),
+        manifest.file_digest(scene.rig_path if rig is not None else scene.cam_cfg_path),
+        f"thresh={THRESH}",
+    ]
+    for cam in cams:
+        mask_path = os.path.join(scene.masks_dir, cam.mask_folder, f"{i:06d}.png")
+        if os.path.isfile(mask_path):
+            parts.append(manifest.file_digest(mask_path))
+        elif mask_store is not None:
+            parts.append(combine_digests([mask_store.packed_bytes(cam.mask_folder, i)]))
+        else:
+            raise FileNotFoundError(f"Mask missing: {mask_path}")
+    return combine_digests(parts)
+
+
+def static_master_prefix(scene=DEFAULT_SCENE):
+    """compressed_prefix of Static_Master.ply, computed once per process."""
+    path = scene.static_master_path()
+    key = (path, os.stat(path).st_mtime_ns)
+    if key not in _STATIC_PREFIX:
+        _STATIC_PREFIX.clear()
+        _STATIC_PREFIX[key] = compressed_prefix(load_ply_gaussians(path, mmap_mode="r"))
+    return _STATIC_PREFIX[key]
+
+
+def load_frame(i, cams, mask_store=None, metrics=NULL_METRICS, stream=False, mmap_mode="r",
+               scene=DEFAULT_SCENE):
+    """
+    Read frame i's masks and, unless streaming, its PLY.
+    Returns (masks, cloud), with cloud None when streaming, or None if the
+    frame is missing.
+    """
+    frame_path = scene.frame_ply_path(i)
+
+    if not os.path.isfile(frame_path):
+        return None
+
+    with metrics.timer("load_masks"):
+        masks_i = load_masks_for_frame(i, cams, mask_store, scene.masks_dir)
+
+    g = None
+    if not stream:
+        with metrics.timer("load_ply"):
+            g = GaussianCloud.load(frame_path, mmap_mode)
+    return masks_i, g
 
-    # Step 1: STATIC MASTER
-    frame_for_exclusion = 30
-    first_frame_path = os.path.join(PLY_DIR, f"time_{frame_for_exclusion:05d}.ply")   
-    print("Loading first frame:", first_frame_path)
 
-    if not os.path.isfile(first_frame_path):
-        print("ERROR: first frame does not exist:", first_frame_path)
+def classify_frame(i, inputs, cams, metrics=NULL_METRICS, stream=False, cull=False, rig=None,
+                   footprint=False, scene=DEFAULT_SCENE, consensus=None, cache=None, early_exit=False,
+                   shards=None, grids=None):
+    """
+    Classify one frame loaded by load_frame.
+    Returns (dynamic_count, dynamic), where dynamic is the lazy selection of
+    dynamic splats; with stream=True the frame is classified out-of-core,
+    its Dynamic PLY is already written and dynamic is None.
+    consensus: optional StaticConsensus the frame's dynamic mask is added to.
+    cache: optional ProjectionCache shared by consecutive frames (not used
+    when streaming).
+    early_exit: stop projecting splats whose label is decided.
+    shards: optional CameraShardPool splitting the cameras across processes.
+    grids: optional GridCache, so cull refits the previous frame's grid
+    (not used when streaming).
+    """
+    masks_i, g = inputs
+
+    if stream:
+        with metrics.timer("classify_stream"):
+            _, dyn_count = classify_ply_streaming(scene.frame_ply_path(i), cams, masks_i,
+                                                  dynamic_path=scene.frame_output_paths(i)[0],
+                                                  thresh=THRESH, cull=cull, metrics=metrics, rig=rig,
+                                                  footprint=footprint, consensus=consensus,
+                                                  early_exit=early_exit, shards=shards)
+        if consensus is not None:
+            consensus.end_frame()
+        return dyn_count, None
+
+    with metrics.timer("classify"):
+        _, dynamic_mask = classify_splats(g, cams, masks_i, thresh=THRESH, cull=cull,
+                                          metrics=metrics, rig=rig, footprint=footprint, cache=cache,
+                                          early_exit=early_exit, shards=shards, grids=grids)
+        dynamic = g.select(dynamic_mask)  # records are gathered by the write
+    if consensus is not None:
+        consensus.add(dynamic_mask)
+        consensus.end_frame()
+    return len(dynamic), dynamic
+
+
+def write_frame(i, dynamic, metrics=NULL_METRICS, compress=False, scene=DEFAULT_SCENE):
+    """
+    Write frame i's Dynamic PLY (unless dynamic is None, i.e. already
+    streamed) and its Final PLY. Final is the payloads of Static_Master.ply
+    and the Dynamic PLY copied kernel-side, so it costs no user-space
+    copies at all. Returns the Final vertex count.
+    compress=True writes both as compressed PLYs instead; Final reuses the
+    once-encoded Static_Master chunks, so only the dynamic splats are
+    encoded per frame.
+    """
+    dyn_path, final_path = scene.frame_output_paths(i)
+
+    if compress:
+        if dynamic is None:
+            dynamic = load_ply_gaussians(dyn_path)  # streamed out uncompressed
+        with metrics.timer("write_dynamic"):
+            save_compressed_ply(dyn_path, dynamic)
+        with metrics.timer("write_final"):
+            return save_compressed_ply(final_path, dynamic, prefix=static_master_prefix(scene))
+
+    if dynamic is not None:
+        with metrics.timer("write_dynamic"):
+            save_ply_gaussians(dyn_path, dynamic)
+
+    # Combine static + dynamic
+    with metrics.timer("write_final"):
+        return concat_ply_files(final_path, [scene.static_master_path(), dyn_path])
+
+
+def write_sequence(manifest, keys, static_key, metrics=NULL_METRICS, scene=DEFAULT_SCENE):
+    """
+    Sequence.gseq: the Static_Master once plus the Dynamic PLY of every frame
+    in keys ({frame: build key}), readable frame by frame with
+    gaussian_io.GaussianSequence.
+    """
+    path = scene.sequence_path()
+    frames = sorted(keys)
+    key = combine_digests([static_key] + [f"{i}:{keys[i]}" for i in frames])
+    if manifest.is_current("sequence", key, [path]):
+        print("Sequence up to date:", path)
         return
 
-    g0 = load_ply_gaussians(first_frame_path)
-    print("Loaded g0:", g0.shape)
+    with metrics.timer("write_sequence"):
+        save_gaussian_sequence(path, scene.static_master_path(),
+                               [(i, scene.frame_output_paths(i)[0]) for i in frames])
+    manifest.record("sequence", key, [path])
+    print("Saved sequence:", path, "frames:", len(frames))
 
-    masks0 = load_masks_for_frame(frame_for_exclusion, cams)
-    print("Loaded masks for frame {frame_for_exclusion}")
 
-    print(f"[DEBUG] Number of cameras: {len(cams)}")
-    print(f"[DEBUG] Number of masks: {len(masks0)}")
+def process_frame(i, cams, mask_store=None, metrics=NULL_METRICS, stream=False, cull=False,
+                  rig=None, compress=False, footprint=False, scene=DEFAULT_SCENE, cache=None,
+                  early_exit=False, shards=None, grids=None):
+    """
+    Classify one frame and write its Dynamic/Final PLYs.
+    With stream=True the frame itself is also classified out-of-core;
+    cull=True frustum-culls voxel cells per camera before projecting;
+    footprint=True samples each splat's projected footprint, not its center;
+    compress=True writes the outputs as compressed PLYs.
+    rig: compiled camera rig, so no projection matrix is rebuilt per frame.
+    scene: where the frame's inputs and outputs live.
+    cache: ProjectionCache, so splats that did not move are not reprojected.
+    early_exit: stop projecting splats whose label is decided.
+    shards: CameraShardPool, so the frame's cameras are voted in parallel.
+    grids: GridCache, so cull refits the previous frame's voxel grid.
+    Returns (dynamic_count, final_count), or None if the frame is missing.
+    """
+    inputs = load_frame(i, cams, mask_store, metrics, stream, scene=scene)
+    if inputs is None:
+        return None
 
-    # Check if cameras and masks match
-    for i, (cam, mask) in enumerate(zip(cams, masks0)):
-        print(f"Camera {i}: {cam.width}x{cam.height}, Mask: {mask.shape}")
-    # --- DEBUGGING MASK CONTENT ---
-    # Check if the first mask in the list contains white (dynamic) pixels
-    import numpy as np
-    
-    # Check if any camera's mask has a max value of 255
-    max_mask_value = max(np.max(m) for m in masks0) if masks0 else 0
+    dyn_count, dynamic = classify_frame(i, inputs, cams, metrics, stream, cull, rig, footprint, scene,
+                                        cache=cache, early_exit=early_exit, shards=shards,
+                                        grids=grids)
+    final_count = write_frame(i, dynamic, metrics, compress, scene)
+
+    metrics.emit(frame=i)
+    return dyn_count, final_count
+
+
+def prefetch_frames(frames, cams, mask_store=None, rig=None, metrics_path=None, debug=False,
+                    depth=2, stream=False, cull=False, compress=False, footprint=False,
+                    scene=DEFAULT_SCENE, cache=None, early_exit=False, shards=None, grids=None):
+    """
+    process_frame over frames with loading, classification and writing in
+    three threads, so frame i+1 is read and frame i-1 written while frame i
+    is classified. depth bounds each hand-off queue, which bounds how many
+    frames are held in memory. Yields results in frame order.
+    """
+    def load(i, _):
+        # Every frame gets its own Metrics, since stages of different frames
+        # run at the same time.
+        metrics = make_metrics(metrics_path, debug)
+        # Read fully here (the read releases the GIL) rather than leaving
+        # page faults to the classify thread.
+        return metrics, load_frame(i, cams, mask_store, metrics, stream, None, scene)
+
+    def classify(i, loaded):
+        metrics, inputs = loaded
+        if inputs is None:
+            return metrics, None
+        return metrics, classify_frame(i, inputs, cams, metrics, stream, cull, rig,
+                                        footprint, scene, cache=cache, early_exit=early_exit,
+                                        shards=shards, grids=grids)
+
+    def write(i, classified):
+        metrics, result = classified
+        if result is None:
+            return None
+        dyn_count, dynamic = result
+        final_count = write_frame(i, dynamic, metrics, compress, scene)
+        metrics.emit(frame=i)
+        return dyn_count, final_count
+
+    for _, result in staged_map(frames, [load, classify, write], depth):
+        yield result
+
+
+def consensus_pass(frames, cams, consensus, mask_store=None, rig=None, metrics_path=None,
+                   debug=False, prefetch=0, stream=False, cull=False, footprint=False,
+                   scene=DEFAULT_SCENE, keep_frame=None, cache=None, early_exit=False, shards=None,
+                   grids=None):
+    """
+    The one read of every frame in --consensus mode: classify it, write its
+    Dynamic PLY (uncompressed; Finals wait for the Static_Master, which is
+    only known at the end) and add its dynamic mask to consensus.
+    prefetch > 0 runs the three steps in threads, as prefetch_frames does.
+    Yields (i, dynamic_count, records), records being a private copy of
+    keep_frame's splats (None for other frames, and when streaming).
+    """
+    def load(i, _):
+        metrics = make_metrics(metrics_path, debug)
+        mmap_mode = None if prefetch > 0 else "r"
+        return metrics, load_frame(i, cams, mask_store, metrics, stream, mmap_mode, scene)
+
+    def classify(i, loaded):
+        metrics, inputs = loaded
+        dyn_count, dynamic = classify_frame(i, inputs, cams, metrics, stream, cull, rig,
+                                            footprint, scene, consensus, cache, early_exit, shards,
+                                            grids)
+        g = inputs[1]
+        records = np.array(g.to_records()) if i == keep_frame and g is not None else None
+        return metrics, dyn_count, dynamic, records
+
+    def write(i, classified):
+        metrics, dyn_count, dynamic, records = classified
+        if dynamic is not None:
+            with metrics.timer("write_dynamic"):
+                save_ply_gaussians(scene.frame_output_paths(i)[0], dynamic)
+        metrics.emit(frame=i)
+        return dyn_count, records
+
+    if prefetch > 0:
+        results = staged_map(frames, [load, classify, write], prefetch)
+    else:
+        results = ((i, write(i, classify(i, load(i, i)))) for i in frames)
+    for i, (dyn_count, records) in results:
+        yield i, dyn_count, records
+
+
+def _save_selected_streaming(src_path, dst_path, keep, chunk_size=STREAM_CHUNK):
+    """Copy the records of src_path where keep is True, chunk by chunk."""
+    start = 0
+    with PlyStreamWriter(dst_path) as out:
+        for chunk in iter_ply_chunks(src_path, chunk_size):
+            out.write(GaussianCloud(chunk).select(keep[start:start + chunk.shape[0]]))
+            start += chunk.shape[0]
+    return out.count
+
+
+def run_consensus(cams, manifest, frames, static_frame, mask_store=None, rig=None,
+                  metrics=NULL_METRICS, metrics_path=None, debug=False, force=False, prefetch=0,
+                  stream=False, cull=False, compress=False, footprint=False, scene=DEFAULT_SCENE,
+                  sequence=False, cache=None, early_exit=False, shards=None, grids=None):
+    """
+    --consensus: one pass over every frame writes the Dynamic PLYs and
+    counts, per splat, the frames it was dynamic in. The Static_Master is
+    then the splats dynamic in at most CONSENSUS_MAX_DYNAMIC of the frames,
+    with static_frame's attributes, and the Finals are assembled from it.
+    Frames must share splat order (a 4D export).
+    The master depends on every frame, so any change rebuilds the scene.
+    Returns False if the static frame is missing, else True.
+    """
+    present = []
+    for i in frames:
+        if os.path.isfile(scene.frame_ply_path(i)):
+            present.append(i)
+        else:
+            print("WARNING: Missing frame, skipping:", scene.frame_ply_path(i))
+    frames = present
+    static_path = scene.static_master_path()
+
+    if static_frame not in frames:
+        print("ERROR: first frame does not exist:", scene.frame_ply_path(static_frame))
+        return False
+
+    counts = {i: ply_vertex_count(scene.frame_ply_path(i)) for i in frames}
+    if len(set(counts.values())) != 1:
+        raise ValueError("--consensus needs frames that share splat order, but splat counts differ: "
+                         f"{sorted(set(counts.values()))}")
+    num_splats = counts[static_frame]
+
+    frame_keys = {i: frame_inputs_key(manifest, i, cams, mask_store, rig, scene) for i in frames}
+    parts = [frame_keys[i] for i in frames]
+    parts += ["consensus", f"static_frame={static_frame}", f"max_dynamic={CONSENSUS_MAX_DYNAMIC}"]
+    if footprint:
+        parts.append("footprint")
+    static_key = combine_digests(parts)
+    keys = {i: combine_digests([frame_keys[i], static_key] + (["compress"] if compress else []))
+            for i in frames}
+    manifest.save()  # keep freshly computed file digests even if nothing runs
+
+    with FileLock(static_path + ".lock"):
+        manifest.refresh()
+        if not force and manifest.is_current("Static_Master", static_key, [static_path]) and all(
+                manifest.is_current(f"frame_{i:05d}", keys[i], scene.frame_output_paths(i))
+                for i in frames):
+            print("Static_Master and all", len(frames), "frames up to date")
+            if sequence:
+                write_sequence(manifest, keys, static_key, metrics, scene)
+            return True
+
+        print("Consensus pass over", len(frames), "frames...")
+        consensus = StaticConsensus(num_splats, len(frames))
+        reference = None
+        for i, dyn_count, records in consensus_pass(frames, cams, consensus, mask_store, rig,
+                                                    metrics_path, debug, prefetch, stream, cull,
+                                                    footprint, scene, static_frame, cache,
+                                                    early_exit, shards, grids):
+            print(f"Frame {i}: dynamic count: {dyn_count}")
+            if records is not None:
+                reference = records
+
+        static_mask = consensus.static_mask()
+        with metrics.timer("write_static"):
+            if reference is not None:
+                save_ply_gaussians(static_path, GaussianCloud(reference).select(static_mask))
+            else:
+                # Streamed: the static frame was not kept, so it is read once more.
+                _save_selected_streaming(scene.frame_ply_path(static_frame), static_path, static_mask)
+        manifest.record("Static_Master", static_key, [static_path])
+        metrics.count("static_splats", np.count_nonzero(static_mask))
+        if debug:
+            metrics.set("dynamic_frames_histogram", np.bincount(consensus.dynamic_frames).tolist())
+        metrics.emit(frame="static")
+        print("Saved Static_Master:", static_path, "count:", int(np.count_nonzero(static_mask)),
+              f"(static in at least {1 - CONSENSUS_MAX_DYNAMIC:.0%} of {consensus.frames} frames)")
+
+    for i in frames:
+        final_count = write_frame(i, None, metrics, compress, scene)
+        dyn_path, final_path = scene.frame_output_paths(i)
+        manifest.record(f"frame_{i:05d}", keys[i], [dyn_path, final_path])
+        print("Saved final:", final_path, "count:", final_count)
+    if sequence:
+        write_sequence(manifest, keys, static_key, metrics, scene)
+    metrics.emit(frame="finals")
+    return True
+
+
+def pipeline_options(stream=False, cull=False, compress=False, footprint=False, scene=DEFAULT_SCENE,
+                     cache_projections=False, early_exit=False, camera_shards=0, workers=1):
+    """The per-frame knobs forwarded to process_frame (and to pool workers)."""
+    options = dict(stream=stream, cull=cull, compress=compress, footprint=footprint, scene=scene,
+                   cache=ProjectionCache() if cache_projections else None, early_exit=early_exit,
+                   shards=None, grids=GridCache() if cull and not stream else None)
+    if camera_shards > 1:
+        if workers > 1:
+            print("--camera-shards splits one frame across processes; ignoring it with --workers")
+        else:
+            # Freed with options when the run returns.
+            options["shards"] = CameraShardPool(camera_shards)
+    return options
+
+
+def static_master_key(manifest, static_frame, cams, mask_store=None, rig=None, scene=DEFAULT_SCENE,
+                      footprint=False):
+    """Build key of Static_Master.ply when taken from static_frame."""
+    key = frame_inputs_key(manifest, static_frame, cams, mask_store, rig, scene)
+    if footprint:
+        key = combine_digests([key, "footprint"])
+    return key
+
+
+def frame_build_key(manifest, i, cams, mask_store, rig, static_key, options):
+    """Build key of frame i's Dynamic/Final PLYs."""
+    # Final_XXXXX embeds the Static_Master, so its key is part of every frame's.
+    parts = [frame_inputs_key(manifest, i, cams, mask_store, rig, options["scene"]), static_key]
+    if options["footprint"]:
+        parts.append("footprint")
+    if options["compress"]:
+        parts.append("compress")
+    return combine_digests(parts)
+
+
+def build_static_master(manifest, static_key, static_frame, cams, mask_store=None, rig=None,
+                        metrics=NULL_METRICS, force=False, debug=False, options=None):
+    """
+    Write Static_Master.ply, the static splats of static_frame, unless the
+    manifest has it current for static_key. options: pipeline_options.
+    """
+    options = options or pipeline_options()
+    scene = options["scene"]
+    stream, cull, footprint = options["stream"], options["cull"], options["footprint"]
+    early_exit = options["early_exit"]
+    frame_path = scene.frame_ply_path(static_frame)
+    static_path = scene.static_master_path()
+
+    # Other jobs of this scene may be running (batch_pipeline.py): one builds
+    # the Static_Master while the rest wait, then find it current.
+    with FileLock(static_path + ".lock"):
+        manifest.refresh()
+        if not force and manifest.is_current("Static_Master", static_key, [static_path]):
+            print("Static_Master up to date:", static_path, "count:", ply_vertex_count(static_path))
+        elif stream:
+            print("Streaming first frame:", frame_path)
+            with metrics.timer("load_masks"):
+                masks0 = load_masks_for_frame(static_frame, cams, mask_store, scene.masks_dir)
+            with metrics.timer("classify_stream"):
+                static_count, dynamic_count = classify_ply_streaming(
+                    frame_path, cams, masks0, static_path=static_path, thresh=THRESH,
+                    cull=cull, metrics=metrics, rig=rig, footprint=footprint, early_exit=early_exit,
+                    shards=options["shards"])
+            print("Static count:", static_count, "Dynamic count:", dynamic_count)
+
+            manifest.record("Static_Master", static_key, [static_path])
+            metrics.emit(frame="static")
+            print("Saved Static_Master:", static_path)
+        else:
+            print("Loading first frame:", frame_path)
+            with metrics.timer("load_ply"):
+                g0 = GaussianCloud.load(frame_path)
+            print("Loaded g0:", (len(g0),))
+
+            with metrics.timer("load_masks"):
+                masks0 = load_masks_for_frame(static_frame, cams, mask_store, scene.masks_dir)
+            print(f"Loaded masks for frame {static_frame}")
+
+            if debug:
+                # Full passes over every mask; only with --debug.
+                for i, (cam, mask) in enumerate(zip(cams, masks0)):
+                    print(f"[DEBUG] Camera {i}: {cam.width}x{cam.height}, Mask: {mask.shape}, "
+                          f"max: {np.max(mask)}, dynamic pixels: {np.count_nonzero(mask)}")
+                metrics.set("mask_dynamic_pixels", [int(np.count_nonzero(m)) for m in masks0])
+
+            print("Classifying static/dynamic...")
+            with metrics.timer("classify"):
+                static_mask, dynamic_mask0 = classify_splats(g0, cams, masks0, thresh=THRESH,
+                                                             cull=cull, metrics=metrics, rig=rig,
+                                                             footprint=footprint,
+                                                             cache=options["cache"],
+                                                             early_exit=early_exit,
+                                                             shards=options["shards"],
+                                                             grids=options["grids"])
+            print("Static count:", np.sum(static_mask), "Dynamic count:", np.sum(dynamic_mask0))
+
+            with metrics.timer("write_static"):
+                static_master = g0.select(static_mask)
+                save_ply_gaussians(static_path, static_master)
+            manifest.record("Static_Master", static_key, [static_path])
+            metrics.emit(frame="static")
+            print("Saved Static_Master:", static_path)
+
+
+def _init_worker(options, metrics_path, debug, use_rig, use_mask_store):
+    # The parent already checked the rig and the mask archive for staleness
+    # (and warned once); workers take its decision instead of re-checking.
+    scene = options["scene"]
+    if use_rig:
+        rig = load_camera_rig(scene.rig_path)
+        _WORKER_STATE["rig"], _WORKER_STATE["cams"] = rig, rig.cameras()
+    else:
+        _WORKER_STATE["rig"], _WORKER_STATE["cams"] = None, load_cameras(scene.cam_cfg_path)
+    _WORKER_STATE["mask_store"] = MaskStore(scene.mask_archive_path) if use_mask_store else None
+    _WORKER_STATE["metrics"] = make_metrics(metrics_path, debug)
+    _WORKER_STATE["options"] = options
+
+
+def _process_frame_worker(i):
+    return process_frame(i, _WORKER_STATE["cams"], _WORKER_STATE["mask_store"],
+                         _WORKER_STATE["metrics"], rig=_WORKER_STATE["rig"],
+                         **_WORKER_STATE["options"])
+
+
+def run_pipeline(workers=1, force=False, stream=False, cull=False, metrics_path=None, debug=False,
+                 prefetch=0, compress=False, footprint=False, scene=None, frames=None,
+                 static_frame=STATIC_FRAME, consensus=False, sequence=False, cache_projections=False,
+                 early_exit=False, camera_shards=0):
+    """
+    metrics_path: append per-frame stage timings/counters as JSON lines.
+    debug: also compute the expensive diagnostics (mask statistics, vote
+    histograms, per-camera hit counts).
+    prefetch: queue depth for overlapping frame I/O and classification in
+    one process (0 = off); ignored when workers > 1.
+    compress: write Dynamic/Final frames as compressed PLYs (Static_Master
+    stays uncompressed, as it is the source of every Final).
+    footprint: area-sample each splat's projected footprint (summed-area
+    tables) instead of its center pixel.
+    scene: Scene to build (default: the layout in the working directory).
+    frames: frame indices to build (default: every frame in the scene).
+    static_frame: frame the Static_Master is taken from.
+    consensus: choose the Static_Master's splats by their votes across all
+    frames, in the same single pass that writes the Dynamic frames (see
+    run_consensus); static_frame then only supplies their attributes.
+    sequence: also write Sequence.gseq, the Static_Master once plus every
+    Dynamic frame, so a viewer loads the background once for the sequence.
+    cache_projections: keep every splat's pixel in every camera from frame
+    to frame and reproject only splats whose position changed (see
+    classify_splats.ProjectionCache); same outputs, more memory.
+    early_exit: stop projecting a splat once enough cameras decided its
+    label (see classify_splats.count_votes_active); same outputs.
+    camera_shards: split each frame's cameras across this many processes
+    (classify_splats.CameraShardPool), for the latency of single large
+    frames; ignored when workers > 1.
+    Returns False if the static frame is missing, else True.
+    """
+    print("=== RUN_PIPELINE START ===")
+
+    scene = scene or DEFAULT_SCENE
+    options = pipeline_options(stream, cull, compress, footprint, scene, cache_projections, early_exit,
+                               camera_shards, workers)
+    metrics = make_metrics(metrics_path, debug)
+
+    print("Loading cameras...")
+    rig, cams = scene.load_cameras()
+    if rig is not None:
+        print("Using compiled camera rig:", scene.rig_path)
+    print("Loaded", len(cams), "cameras")
     
-    print(f"[DEBUG] Total cameras: {len(masks0)}")
-    print(f"[DEBUG] Max pixel value across all masks (should be 255 if person is visible): {max_mask_value}")
-    # --- END DEBUGGING MASK CONTENT ---
+    os.makedirs(scene.out_dir, exist_ok=True)
+    print("Output directory:", scene.out_dir)
 
+    mask_store = scene.open_mask_store()
+    if mask_store is not None:
+        print("Reading masks from packed archive:", scene.mask_archive_path)
 
-    print(f"[DEBUG] First mask shape: {masks0[0].shape}")
-    print(f"[DEBUG] First mask max value: {np.max(masks0[0])}")
+    # Targets whose input key is unchanged (and whose outputs exist) are
+    # skipped; the manifest is saved after every target, so an interrupted
+    # run resumes where it stopped.
+    manifest = BuildManifest(os.path.join(scene.out_dir, MANIFEST_NAME))
 
-    print("Classifying static/dynamic...")
-    static_mask, dynamic_mask0 = classify_splats(g0, cams, masks0, thresh=1)
-    print("Static count:", np.sum(static_mask), "Dynamic count:", np.sum(dynamic_mask0))
+    if frames is None:
+        frames = scene.frames()
 
-    static_master = g0[static_mask]
-    static_path = os.path.join(OUT_DIR, "Static_Master.ply")
-    save_ply_gaussians(static_path, static_master)
-    print("Saved Static_Master:", static_path)
+    if consensus:
+        if workers > 1:
+            print("--consensus runs in one process; ignoring --workers (use --prefetch)")
+        ok = run_consensus(cams, manifest, frames, static_frame, mask_store, rig, metrics,
+                           metrics_path, debug, force, prefetch, stream, cull, compress, footprint,
+                           scene, sequence, options["cache"], early_exit, options["shards"],
+                           options["grids"])
+        if ok:
+            print("=== RUN_PIPELINE COMPLETE ===")
+        return ok
 
-    # Step 2: Per-frame dynamic extraction
-    num_frames = 58
-    print("Processing", num_frames, "frames...")
+    # Step 1: STATIC MASTER
+    if not os.path.isfile(scene.frame_ply_path(static_frame)):
+        print("ERROR: first frame does not exist:", scene.frame_ply_path(static_frame))
+        return False
+
+    static_key = static_master_key(manifest, static_frame, cams, mask_store, rig, scene, footprint)
+    build_static_master(manifest, static_key, static_frame, cams, mask_store, rig, metrics, force,
+                        debug, options)
 
-    for i in range(num_frames):
-        fname = f"time_{i:05d}.ply"
-        frame_path = os.path.join(PLY_DIR, fname)
-        print(f"\nFrame {i}: {frame_path}")
+    # Step 2: Per-frame dynamic extraction
+    print("Processing", len(frames), "frames...")
 
+    pending = []
+    keys = {}
+    for i in frames:
+        frame_path = scene.frame_ply_path(i)
         if not os.path.isfile(frame_path):
             print("WARNING: Missing frame, skipping:", frame_path)
             continue
 
-        g = load_ply_gaussians(frame_path)
-        masks_i = load_masks_for_frame(i, cams)
+        keys[i] = frame_build_key(manifest, i, cams, mask_store, rig, static_key, options)
+        if not force and manifest.is_current(f"frame_{i:05d}", keys[i], scene.frame_output_paths(i)):
+            print(f"Frame {i}: up to date")
+            continue
+        pending.append(i)
+
+    manifest.save()  # keep freshly computed file digests even if nothing runs
+    print(len(pending), "frames to (re)build")
+
+    if workers > 1 and pending:
+        print("Using", workers, "worker processes")
+        pool = mp.Pool(workers, initializer=_init_worker,
+                       initargs=(options, metrics_path, debug, rig is not None, mask_store is not None))
+        # imap yields results in frame order regardless of completion order
+        results = pool.imap(_process_frame_worker, pending)
+    elif prefetch > 0:
+        print("Prefetching frames, queue depth", prefetch)
+        pool = None
+        results = prefetch_frames(pending, cams, mask_store, rig, metrics_path, debug,
+                                  depth=prefetch, **options)
+    else:
+        pool = None
+        results = (process_frame(i, cams, mask_store, metrics, rig=rig, **options) for i in pending)
 
-        _, dynamic_mask = classify_splats(g, cams, masks_i, thresh=1)
-        dynamic = g[dynamic_mask]
+    try:
+        for i, result in zip(pending, results):
+            frame_path = scene.frame_ply_path(i)
+            print(f"\nFrame {i}: {frame_path}")
 
-        dyn_path = os.path.join(OUT_DIR, f"Dynamic_{i:05d}.ply")
-        save_ply_gaussians(dyn_path, dynamic)
-        print("Saved dynamic:", dyn_path, "count:", dynamic.shape[0])
+            if result is None:
+                print("WARNING: Missing frame, skipping:", frame_path)
+                continue
 
-        # Combine static + dynamic
-        final = np.concatenate([static_master, dynamic])
-        final_path = os.path.join(OUT_DIR, f"Final_{i:05d}.ply")
-        save_ply_gaussians(final_path, final)
-        print("Saved final:", final_path, "count:", final.shape[0])
+            dyn_count, final_count = result
+            dyn_path, final_path = scene.frame_output_paths(i)
+            manifest.record(f"frame_{i:05d}", keys[i], [dyn_path, final_path])
+            print("Saved dynamic:", dyn_path, "count:", dyn_count)
+            print("Saved final:", final_path, "count:", final_count)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        else:
+            results.close()  # stops prefetch threads if the loop ended early
+
+    if sequence:
+        write_sequence(manifest, keys, static_key, metrics, scene)
 
     print("=== RUN_PIPELINE COMPLETE ===")
+    return True
+
+
+def frame_input_paths(i, cams, scene=DEFAULT_SCENE):
+    """Frame i's PLY and its mask PNG from every camera."""
+    return [scene.frame_ply_path(i)] + [os.path.join(scene.masks_dir, cam.mask_folder, f"{i:06d}.png")
+                                        for cam in cams]
+
+
+def ready_frames(cams, scene=DEFAULT_SCENE, settle_s=WATCH_SETTLE_S):
+    """
+    Frames whose PLY and every mask are present and have not been modified
+    for settle_s seconds (so files still being copied in are left alone).
+    Returns {frame: signature}, the signature changing whenever any input
+    is rewritten.
+    """
+    now = time.time()
+    ready = {}
+    for i in scene.frames():
+        signature = []
+        for path in frame_input_paths(i, cams, scene):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                break
+            if now - st.st_mtime < settle_s:
+                break
+            signature.append((st.st_size, st.st_mtime_ns))
+        else:
+            ready[i] = tuple(signature)
+    return ready
+
+
+def watch_pipeline(force=False, stream=False, cull=False, metrics_path=None, debug=False,
+                   compress=False, footprint=False, scene=None, static_frame=STATIC_FRAME,
+                   sequence=False, cache_projections=False, early_exit=False, camera_shards=0,
+                   poll_s=WATCH_POLL_S, settle_s=WATCH_SETTLE_S, idle_exit_s=None):
+    """
+    Service mode for live captures: poll the scene and build every frame as
+    soon as its PLY and all its masks have landed (see ready_frames).
+    Cameras, the Static_Master, the manifest and the classification caches
+    stay loaded between frames, so each new frame costs only its own load,
+    classification and writes. Frames wait until the static frame has
+    arrived. A rewritten input rebuilds its frame; a rewritten static
+    frame rebuilds the Static_Master and then every frame.
+    Masks are read from their PNGs, since the packed archive is only built
+    once a capture is complete.
+    Runs until interrupted, or until nothing new arrived for idle_exit_s
+    seconds. Flags are those of run_pipeline; sequence=True writes
+    Sequence.gseq when the watch ends.
+    """
+    print("=== WATCH START ===")
+
+    scene = scene or DEFAULT_SCENE
+    options = pipeline_options(stream, cull, compress, footprint, scene, cache_projections, early_exit,
+                               camera_shards)
+    metrics = make_metrics(metrics_path, debug)
+
+    rig, cams = scene.load_cameras()
+    print("Loaded", len(cams), "cameras")
+    os.makedirs(scene.out_dir, exist_ok=True)
+    manifest = BuildManifest(os.path.join(scene.out_dir, MANIFEST_NAME))
+    print(f"Watching {scene.ply_dir} and {scene.masks_dir} every {poll_s}s")
+
+    static_key = None
+    static_failed = None  # signature of the static frame's last failed build
+    waiting = False
+    built = {}  # frame -> input signature it was last built (or found current) from
+    keys = {}
+    last_activity = time.time()
+    try:
+        while True:
+            ready = ready_frames(cams, scene, settle_s)
+
+            if static_frame not in ready:
+                if static_key is None and ready and not waiting:
+                    print(f"Frames are arriving; waiting for static frame {static_frame}")
+                    waiting = True
+            elif ready[static_frame] != static_failed and (
+                    built.get(static_frame) != ready[static_frame] or static_key is None):
+                try:
+                    key = static_master_key(manifest, static_frame, cams, None, rig, scene, footprint)
+                    if key != static_key:
+                        build_static_master(manifest, key, static_frame, cams, None, rig, metrics,
+                                            force, debug, options)
+                        static_key = key
+                        built = {}  # every Final embeds the master
+                except Exception:
+                    # As for frames: keep the previous master (if any) and
+                    # retry once the static frame's files change.
+                    static_failed = ready[static_frame]
+                    print(f"[WARN] Static_Master from frame {static_frame} failed:")
+                    traceback.print_exc()
+
+            todo = [i for i in sorted(ready) if static_key is not None and built.get(i) != ready[i]]
+            for i in todo:
+                t0 = time.perf_counter()
+                try:
+                    keys[i] = frame_build_key(manifest, i, cams, None, rig, static_key, options)
+                    if not force and manifest.is_current(f"frame_{i:05d}", keys[i],
+                                                         scene.frame_output_paths(i)):
+                        print(f"Frame {i}: up to date")
+                    else:
+                        dyn_count, final_count = process_frame(i, cams, None, metrics, rig=rig,
+                                                               **options)
+                        manifest.record(f"frame_{i:05d}", keys[i], scene.frame_output_paths(i))
+                        print(f"Frame {i}: dynamic count: {dyn_count}, final count: {final_count} "
+                              f"({time.perf_counter() - t0:.2f}s)")
+                except Exception:
+                    # A broken input must not stop the service; it is retried
+                    # once any of its files changes.
+                    keys.pop(i, None)
+                    print(f"[WARN] Frame {i} failed:")
+                    traceback.print_exc()
+                built[i] = ready[i]
+
+            now = time.time()
+            if todo:
+                last_activity = now
+            elif idle_exit_s is not None and now - last_activity > idle_exit_s:
+                print(f"Nothing new for {idle_exit_s}s")
+                break
+            time.sleep(poll_s)
+    except KeyboardInterrupt:
+        print("Interrupted")
+    finally:
+        if sequence and keys:
+            write_sequence(manifest, keys, static_key, metrics, scene)
+
+    print("=== WATCH STOPPED ===")
 
 
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Split Gaussian PLY frames into static/dynamic.")
+    parser.add_argument("--scene", default="", metavar="DIR",
+                        help="scene root holding the PLY, dataset and output directories "
+                             "(default: the working directory)")
+    parser.add_argument("--static-frame", type=int, default=STATIC_FRAME,
+                        help=f"frame the Static_Master is taken from (default: {STATIC_FRAME})")
+    parser.add_argument("--consensus", action="store_true",
+                        help="pick the Static_Master by per-splat votes across all frames, in the "
+                             "same pass that writes the Dynamic frames (frames must share splat order)")
+    parser.add_argument("--sequence", action="store_true",
+                        help="also write Sequence.gseq: the Static_Master once plus every Dynamic "
+                             "frame, with a frame offset table for random access")
+    parser.add_argument("--cache-projections", action="store_true",
+                        help="reuse each splat's projections from the previous frame when its "
+                             "position did not change (costs 4 bytes per splat and camera)")
+    parser.add_argument("--early-exit", action="store_true",
+                        help="stop projecting a splat once its static/dynamic label is decided, "
+                             "visiting cameras with the most dynamic pixels first")
+    parser.add_argument("--camera-shards", type=int, default=0, metavar="N",
+                        help="split each frame's cameras across N processes sharing the splats "
+                             "in shared memory, for single-frame latency (not with --workers)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes for the per-frame loop (default: 1)")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild every output, ignoring the build manifest")
+    parser.add_argument("--stream", action="store_true",
+                        help="classify out-of-core in fixed-size chunks (for clouds larger than RAM)")
+    parser.add_argument("--cull", action="store_true",
+                        help="voxel-grid frustum culling against each mask's bounding box before "
+                             "projection; the grid is built on the first frame and refit on later "
+                             "ones, so only multi-frame runs gain")
+    parser.add_argument("--footprint", action="store_true",
+                        help="vote with the fraction of each splat's projected footprint that is "
+                             "dynamic, instead of its center pixel")
+    parser.add_argument("--compress", action="store_true",
+                        help="write Dynamic/Final frames as compressed (quantized, SuperSplat-style) PLYs")
+    parser.add_argument("--metrics", default=None, metavar="PATH",
+                        help="append per-frame stage timings and counters to PATH as JSON lines")
+    parser.add_argument("--prefetch", type=int, default=0, metavar="DEPTH",
+                        help="overlap reading, classifying and writing frames in threads, "
+                             "with at most DEPTH frames queued per stage (default: 0, off)")
+    parser.add_argument("--debug", action="store_true",
+                        help="compute expensive diagnostics (mask stats, vote histograms, per-camera hits)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and build each frame as soon as its PLY and all its "
+                             "masks have landed (live capture)")
+    parser.add_argument("--poll", type=float, default=WATCH_POLL_S, metavar="SECONDS",
+                        help=f"--watch: seconds between scans (default: {WATCH_POLL_S})")
+    parser.add_argument("--idle-exit", type=float, default=None, metavar="SECONDS",
+                        help="--watch: stop after this long without a new frame (default: never)")
+    args = parser.parse_args()
+
+    if args.watch:
+        if args.consensus:
+            parser.error("--consensus needs every frame; it cannot be combined with --watch")
+        watch_pipeline(force=args.force, stream=args.stream, cull=args.cull, metrics_path=args.metrics,
+                       debug=args.debug, compress=args.compress, footprint=args.footprint,
+                       scene=Scene(args.scene), static_frame=args.static_frame, sequence=args.sequence,
+                       cache_projections=args.cache_projections, early_exit=args.early_exit,
+                       camera_shards=args.camera_shards, poll_s=args.poll, idle_exit_s=args.idle_exit)
+    else:
+        run_pipeline(workers=args.workers, force=args.force, stream=args.stream, cull=args.cull,
+                     metrics_path=args.metrics, debug=args.debug, prefetch=args.prefetch,
+                     compress=args.compress, footprint=args.footprint, scene=Scene(args.scene),
+                     static_frame=args.static_frame, consensus=args.consensus, sequence=args.sequence,
+                     cache_projections=args.cache_projections, early_exit=args.early_exit,
+                     camera_shards=args.camera_shards)
\ No newline at end of file
@@ -0,0 +1,262 @@
+import os
+import json
+import hashlib
+import argparse
+
+import numpy as np
+
+from pipeline_utils import (
+    CAM_CFG_PATH,
+    DATA_ROOT,
+    MASKS_DIR,
+    Camera,
+    build_projection_matrices,
+    load_cameras,
+    load_masks_for_frame,
+)
+from colmap_utils import CAMERA_MODELS, build_K, cameras_from_colmap_bin, qvec2rotmat
+from colmap_text_utils import iter_images_text, read_cameras_text
+from mask_store import MASK_ARCHIVE_PATH, MaskStore
+
+RIG_PATH = os.path.join(DATA_ROOT, "camera_rig.npz")
+
+_MODEL_IDS = {name: model_id for model_id, (name, _) in CAMERA_MODELS.items()}
+
+
+class CameraRig:
+    """
+    Precompiled cameras for the hot path.
+
+    P (C,3,4) float32 maps world points straight to mask pixels (the
+    C2W -> W2C inversion and the mask-resolution scale are already folded
+    in), so per-frame classification never rebuilds matrices. K/R/T are
+    kept in the camera_config.json convention (R, T camera-to-world) so
+    cameras() can hand the same Camera objects to the rest of the pipeline.
+    config_digest: digest of the camera_config.json it was compiled from
+    (see config_digest), so a rig left behind by an edited config is
+    detected; empty when unknown.
+    """
+
+    def __init__(self, P, image_sizes, mask_sizes, mask_folders, image_names, K, R, T,
+                 config_digest=""):
+        self.P = P
+        self.image_sizes = image_sizes  # (C,2) (H, W)
+        self.mask_sizes = mask_sizes    # (C,2) (H, W)
+        self.mask_folders = list(mask_folders)
+        self.image_names = list(image_names)
+        self.K = K
+        self.R = R
+        self.T = T
+        self.config_digest = config_digest
+        self._cams = None
+
+    def __len__(self):
+        return len(self.mask_folders)
+
+    def cameras(self):
+        if self._cams is None:
+            self._cams = [
+                Camera(self.K[c], self.R[c], self.T[c], int(self.image_sizes[c, 1]),
+                       int(self.image_sizes[c, 0]), self.mask_folders[c], self.image_names[c])
+                for c in range(len(self))
+            ]
+        return self._cams
+
+    def matches(self, mask_sizes):
+        """True when P was built for masks of exactly these (H, W) sizes."""
+        return np.array_equal(self.mask_sizes, np.asarray(mask_sizes))
+
+    def save(self, path=RIG_PATH):
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            P=self.P,
+            image_sizes=self.image_sizes,
+            mask_sizes=self.mask_sizes,
+            mask_folders=np.array(self.mask_folders),
+            image_names=np.array(self.image_names),
+            K=self.K,
+            R=self.R,
+            T=self.T,
+            config_digest=np.array(self.config_digest),
+        )
+        os.replace(tmp_path, path)
+
+
+def config_digest(path=CAM_CFG_PATH):
+    """Content digest of a camera_config.json."""
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def build_camera_rig(cams, mask_sizes, config_digest=""):
+    """
+    cams: list of Camera; mask_sizes: (H, W) of each camera's masks;
+    config_digest: digest of the camera_config.json cams were loaded from.
+    """
+    mask_sizes = np.asarray(mask_sizes, dtype=np.int32).reshape(len(cams), 2)
+    return CameraRig(
+        P=build_projection_matrices(cams, mask_sizes).astype(np.float32),
+        image_sizes=np.array([(cam.height, cam.width) for cam in cams], dtype=np.int32).reshape(-1, 2),
+        mask_sizes=mask_sizes,
+        mask_folders=[cam.mask_folder for cam in cams],
+        image_names=[cam.image_name or cam.mask_folder + ".png" for cam in cams],
+        K=np.array([cam.K for cam in cams], dtype=float).reshape(-1, 3, 3),
+        R=np.array([cam.R for cam in cams], dtype=float).reshape(-1, 3, 3),
+        T=np.array([np.ravel(cam.T) for cam in cams], dtype=float).reshape(-1, 3),
+        config_digest=config_digest,
+    )
+
+
+def load_camera_rig(path=RIG_PATH):
+    with np.load(path, allow_pickle=False) as data:
+        return CameraRig(
+            P=data["P"],
+            image_sizes=data["image_sizes"],
+            mask_sizes=data["mask_sizes"],
+            mask_folders=data["mask_folders"].tolist(),
+            image_names=data["image_names"].tolist(),
+            K=data["K"],
+            R=data["R"],
+            T=data["T"],
+            config_digest=str(data["config_digest"]) if "config_digest" in data.files else "",
+        )
+
+
+def open_camera_rig(path=RIG_PATH, config_path=CAM_CFG_PATH):
+    """
+    The compiled rig when it has been built from the current config_path,
+    else None. A rig compiled from another version of the config (or too
+    old to record which) is reported and ignored.
+    """
+    if not os.path.isfile(path):
+        return None
+    rig = load_camera_rig(path)
+    if os.path.isfile(config_path) and rig.config_digest != config_digest(config_path):
+        print(f"[WARN] {path} was not compiled from the current {config_path}; using the config. "
+              "Re-run camera_rig.py to recompile it.")
+        return None
+    return rig
+
+
+# --------- Building from COLMAP ---------
+
+def _colmap_views(sparse_dir):
+    """
+    (K, width, height, R_W2C, T_W2C, image_name) for every image of a
+    COLMAP model, text (cameras.txt/images.txt) or binary.
+    """
+    if os.path.isfile(os.path.join(sparse_dir, "images.txt")):
+        cameras = read_cameras_text(os.path.join(sparse_dir, "cameras.txt"))
+        for image in iter_images_text(os.path.join(sparse_dir, "images.txt")):
+            model, width, height, params = cameras[image["camera_id"]]
+            if model not in _MODEL_IDS:
+                raise RuntimeError(f"Unsupported camera model {model}")
+            K = build_K(_MODEL_IDS[model], params)
+            yield K, width, height, qvec2rotmat(image["qvec"]), image["tvec"], image["name"]
+    else:
+        cameras, images = cameras_from_colmap_bin(sparse_dir)
+        for image_id in sorted(images):
+            image = images[image_id]
+            cam = cameras[image["camera_id"]]
+            yield cam["K"], cam["width"], cam["height"], image["R"], image["T"], image["name"]
+
+
+def cameras_from_colmap(sparse_dir, mask_folders=None):
+    """
+    Cameras of a COLMAP model in the camera_config.json convention: one per
+    image, mask folder = image name without extension, R/T stored
+    camera-to-world. Text models keep images.txt order, as
+    generate_camera_config.py always did; binary models are sorted by mask
+    folder, as step1_build_camera_config.py did.
+    mask_folders: optional set of folders to keep; other views are skipped.
+    """
+    cams = []
+    for K, width, height, R_W2C, T_W2C, image_name in _colmap_views(sparse_dir):
+        folder = os.path.splitext(os.path.basename(image_name))[0]
+        if mask_folders is not None and folder not in mask_folders:
+            print(f"Skipping missing or unused view: {image_name}")
+            continue
+
+        # Convert to C2W, which is what camera_config.json stores
+        R_C2W = R_W2C.T
+        T_C2W = -R_C2W @ np.asarray(T_W2C, dtype=float)
+        cams.append(Camera(K, R_C2W, T_C2W, int(width), int(height), folder, image_name))
+
+    if os.path.isfile(os.path.join(sparse_dir, "images.txt")):
+        return cams
+    return sorted(cams, key=lambda cam: cam.mask_folder)
+
+
+def save_camera_config(cams, path=CAM_CFG_PATH):
+    cameras_cfg = []
+    for cam_index, cam in enumerate(cams):
+        cameras_cfg.append({
+            "cam_index": cam_index,
+            "image_name": cam.image_name or cam.mask_folder + ".png",
+            "mask_folder": cam.mask_folder,
+            "width": cam.width,
+            "height": cam.height,
+            "K": np.asarray(cam.K).tolist(),
+            "R": np.asarray(cam.R).tolist(),
+            "T": np.asarray(cam.T).tolist(),
+        })
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"cameras": cameras_cfg}, f, indent=4)
+
+
+def mask_sizes_for(cams, masks_dir=MASKS_DIR, store=None, frame_idx=0):
+    """(H, W) of each camera's masks, read from one frame."""
+    masks = load_masks_for_frame(frame_idx, cams, store=store, masks_dir=masks_dir)
+    return [m.shape[:2] for m in masks]
+
+
+def build_camera_config(sparse_dir=None, mask_folders=None, config_path=CAM_CFG_PATH,
+                        rig_path=RIG_PATH, masks_dir=MASKS_DIR, store=None):
+    """
+    The one camera config builder: COLMAP model -> camera_config.json, plus
+    the compiled rig when masks are available to size it.
+    sparse_dir=None recompiles the rig from an existing camera_config.json.
+    Returns the list of cameras.
+    """
+    if sparse_dir is None:
+        cams = load_cameras(config_path)
+    else:
+        cams = cameras_from_colmap(sparse_dir, mask_folders)
+        for cam_index, cam in enumerate(cams):
+            print(f"cam_index={cam_index:2d}  cam='{cam.mask_folder}'  image='{cam.image_name}'")
+            if not os.path.isdir(os.path.join(masks_dir, cam.mask_folder)):
+                print(f"[WARN] Mask folder not found: {os.path.join(masks_dir, cam.mask_folder)}")
+        save_camera_config(cams, config_path)
+        print("Generated", config_path, "with", len(cams), "cameras.")
+
+    if rig_path is None:
+        return cams
+    try:
+        mask_sizes = mask_sizes_for(cams, masks_dir, store)
+    except FileNotFoundError as e:
+        print(f"[WARN] Camera rig not written, no masks to size it: {e}")
+        return cams
+    build_camera_rig(cams, mask_sizes, config_digest(config_path)).save(rig_path)
+    print("Compiled camera rig:", rig_path)
+    return cams
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build camera_config.json and the compiled camera rig from a COLMAP model.")
+    parser.add_argument("--sparse", default=None,
+                        help="COLMAP model directory (text or binary); omit to recompile the rig "
+                             "from the existing camera config")
+    parser.add_argument("--config", default=CAM_CFG_PATH)
+    parser.add_argument("--rig", default=RIG_PATH)
+    parser.add_argument("--masks-dir", default=MASKS_DIR)
+    parser.add_argument("--cameras", nargs="+", default=None, metavar="FOLDER",
+                        help="only keep these mask folders (default: every image)")
+    args = parser.parse_args()
+
+    store = MaskStore(MASK_ARCHIVE_PATH) if os.path.isfile(MASK_ARCHIVE_PATH) else None
+    build_camera_config(args.sparse, set(args.cameras) if args.cameras else None, args.config,
+                        args.rig, args.masks_dir, store)
@@ -1,64 +1,741 @@
+import weakref
+import threading
+import multiprocessing as mp
+from multiprocessing import resource_tracker, shared_memory
+
 import numpy as np
-from pipeline_utils import project_points
+from gaussian_io import GaussianCloud, PlyStreamWriter, as_gaussian_cloud, iter_ply_chunks
+from metrics import NULL_METRICS
+from spatial_index import VoxelGrid
+from pipeline_utils import (
+    PROJECTION_CHUNK,
+    build_projection_matrices,
+    flatten_masks,
+    footprint_radii,
+    integral_masks,
+    project_footprint_boxes,
+    project_pixel_indices,
+)
+
+# Records per read in classify_ply_streaming (~68 MB of GAUSSIAN_DTYPE).
+STREAM_CHUNK = 1 << 20
+
+# With footprint sampling, a camera votes dynamic when at least this
+# fraction of the splat's projected box is dynamic pixels.
+FOOTPRINT_COVERAGE = 0.5
+
+# Cameras projected together per step of count_votes_active: enough rows
+# to keep the projection one GEMM, few enough to prune the active set often.
+ACTIVE_CAMERA_GROUP = 4
+# The active set is compacted once at least 1/ACTIVE_COMPACT_RATIO of it
+# is decided.
+ACTIVE_COMPACT_RATIO = 8
+
+# Consensus Static_Master: a splat is static when it was voted dynamic in at
+# most this fraction of the frames.
+CONSENSUS_MAX_DYNAMIC = 0.5
+
+
+class FrameViews:
+    """
+    Everything classification needs from one frame's cameras and masks:
+    one (C,3,4) tensor that maps world points straight to mask pixels, and
+    one flat buffer holding every binarized mask. Built once per frame and
+    reused for every chunk of splats.
+    rig: optional camera_rig.CameraRig; its precompiled P is used as-is
+    when it was built for these mask sizes.
+    """
+
+    def __init__(self, cams, masks, rig=None):
+        self.mask_flat, self.offsets, self.sizes = flatten_masks(masks)
+        if rig is not None and rig.matches(self.sizes):
+            self.P = rig.P
+        else:
+            self.P = build_projection_matrices(cams, self.sizes)
+        # Focal lengths in mask pixels, for projecting footprint radii.
+        self.focal = np.array([
+            (cam.K[0][0] * W / cam.width, cam.K[1][1] * H / cam.height)
+            for cam, (H, W) in zip(cams, self.sizes)
+        ]).reshape(-1, 2)
+        self._rects = None
+        self._integral = None
+
+    @classmethod
+    def from_buffers(cls, P, mask_flat, offsets, sizes):
+        """
+        FrameViews over masks that are already flattened (e.g. in shared
+        memory). Focal lengths are not known, so footprint voting is not
+        available on them.
+        """
+        views = cls.__new__(cls)
+        views.P, views.mask_flat, views.offsets, views.sizes = P, mask_flat, offsets, sizes
+        views.focal = None
+        views._rects = None
+        views._integral = None
+        return views
+
+    def integral(self):
+        """(flat, offsets) summed-area tables of the masks, built on first use."""
+        if self._integral is None:
+            masks = [self.mask_flat[off:off + H * W].reshape(H, W)
+                     for off, (H, W) in zip(self.offsets, self.sizes)]
+            self._integral = integral_masks(masks)
+        return self._integral
+
+    def mask_rects(self):
+        """
+        Per camera, the inclusive (u0, v0, u1, v1) bounding box of its
+        dynamic pixels, or None when the mask is empty.
+        """
+        if self._rects is None:
+            self._rects = []
+            for off, (H, W) in zip(self.offsets, self.sizes):
+                m = self.mask_flat[off:off + H * W].reshape(H, W)
+                rows = np.flatnonzero(m.any(axis=1))
+                if rows.size == 0:
+                    self._rects.append(None)
+                    continue
+                cols = np.flatnonzero(m.any(axis=0))
+                self._rects.append((cols[0], rows[0], cols[-1], rows[-1]))
+        return self._rects
+
+
+class VoteWorkspace:
+    """
+    Scratch buffers for one chunk of count_votes' dense path: the
+    projection, depth reciprocals, pixel coordinates, validity and mask
+    hits of every camera. They are allocated on first use, grown only when
+    a larger camera count or chunk size comes along, and reused for every
+    chunk, frame and run in the thread that owns them, so the kernel
+    allocates nothing per chunk. Float buffers take the dtype of the
+    projection tensor (float32 with a compiled camera rig).
+    """
+
+    def __init__(self):
+        self.dtype = None
+        self.size = 0  # cameras * splats the buffers hold
+
+    def views(self, C, n, dtype):
+        """(pts, proj, inv_depth, u, v, valid, ok, hits) views for C cameras and n splats."""
+        if dtype != self.dtype or C * n > self.size:
+            size = max(C * n, self.size if dtype == self.dtype else 0)
+            self.pts = np.empty(n * 3, dtype=dtype)
+            self.proj = np.empty(size * 3, dtype=dtype)
+            self.inv_depth = np.empty(size, dtype=dtype)
+            self.u = np.empty(size, dtype=np.int32)
+            self.v = np.empty(size, dtype=np.int32)
+            self.valid = np.empty(size, dtype=bool)
+            self.ok = np.empty(size, dtype=bool)
+            self.hits = np.empty(size, dtype=np.uint8)
+            self.dtype, self.size = dtype, size
+        if self.pts.size < n * 3:
+            self.pts = np.empty(n * 3, dtype=dtype)
+        cn = C * n
+        return (self.pts[:n * 3].reshape(n, 3), self.proj[:cn * 3].reshape(C * 3, n),
+                self.inv_depth[:cn].reshape(C, n), self.u[:cn].reshape(C, n),
+                self.v[:cn].reshape(C, n), self.valid[:cn].reshape(C, n),
+                self.ok[:cn].reshape(C, n), self.hits[:cn].reshape(C, n))
+
+
+_THREAD_STATE = threading.local()
+
+
+def thread_workspace():
+    """The calling thread's VoteWorkspace, kept for the life of the thread."""
+    ws = getattr(_THREAD_STATE, "workspace", None)
+    if ws is None:
+        ws = _THREAD_STATE.workspace = VoteWorkspace()
+    return ws
+
+
+def _count_votes_dense(xyz, views, dynamic_votes, chunk_size, workspace, valid_hits=None,
+                       dynamic_hits=None):
+    """
+    count_votes without an index, done in place in workspace buffers:
+    project_pixel_indices and the mask gather fused per chunk, with the
+    flat mask index (v*W + u + offset, or the zero sentinel) computed
+    straight into the v buffer.
+    """
+    P = views.P
+    C = P.shape[0]
+    M = np.ascontiguousarray(P[:, :, :3].reshape(C * 3, 3))
+    t = P[:, :, 3].reshape(C * 3, 1)
+    H = views.sizes[:, 0].astype(np.uint32)[:, None]
+    W = views.sizes[:, 1].astype(np.uint32)[:, None]
+    W_int = W.astype(np.int32)
+    offsets = views.offsets[:, None]
+    sentinel = views.mask_flat.size - 1
+
+    N = xyz.shape[0]
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for start in range(0, N, chunk_size):
+            stop = min(start + chunk_size, N)
+            pts, proj, inv_depth, u, v, valid, ok, hits = workspace.views(C, stop - start, P.dtype)
+
+            np.copyto(pts, xyz[start:stop], casting="same_kind")
+            np.matmul(M, pts.T, out=proj)
+            proj += t
+            proj3 = proj.reshape(C, 3, -1)
+            depth = proj3[:, 2]
+            np.divide(1.0, depth, out=inv_depth)
+
+            # Floor in the float rows, then truncate into the int buffers.
+            np.multiply(proj3[:, 0], inv_depth, out=proj3[:, 0])
+            np.floor(proj3[:, 0], out=proj3[:, 0])
+            np.copyto(u, proj3[:, 0], casting="unsafe")
+            np.multiply(proj3[:, 1], inv_depth, out=proj3[:, 1])
+            np.floor(proj3[:, 1], out=proj3[:, 1])
+            np.copyto(v, proj3[:, 1], casting="unsafe")
+
+            # Same unsigned-view bounds test as project_pixel_indices.
+            np.less(u.view(np.uint32), W, out=valid)
+            np.less(v.view(np.uint32), H, out=ok)
+            valid &= ok
+            np.greater(depth, 0, out=ok)
+            valid &= ok
+
+            np.multiply(v, W_int, out=v)
+            v += u
+            v += offsets
+            np.logical_not(valid, out=ok)
+            np.copyto(v, sentinel, where=ok)
+
+            np.take(views.mask_flat, v, out=hits, mode="clip")
+            np.add.reduce(hits, axis=0, dtype=np.int32, out=dynamic_votes[start:stop])
+
+            if valid_hits is not None:
+                valid_hits += np.count_nonzero(valid, axis=1)
+                dynamic_hits += np.count_nonzero(hits, axis=1)
+
+
+def count_votes(xyz, views, chunk_size=PROJECTION_CHUNK, index=None, metrics=NULL_METRICS,
+                workspace=None):
+    """
+    Number of cameras whose mask marks each splat of xyz (N,3) dynamic.
+    index: optional spatial_index.VoxelGrid over xyz; each camera then
+    projects only splats in cells that can reach its mask's bounding box.
+    With metrics.debug, per-camera valid/dynamic hit counts are recorded.
+    workspace: VoteWorkspace for the dense path (default: the calling
+    thread's, see thread_workspace).
+    """
+    N = xyz.shape[0]
+    dynamic_votes = np.zeros(N, dtype=np.int32)
+
+    C = views.P.shape[0]
+    if metrics.debug:
+        valid_hits = np.zeros(C, dtype=np.int64)
+        dynamic_hits = np.zeros(C, dtype=np.int64)
+
+    if index is not None:
+        # Work on the splats in cell order: each camera's surviving cells are
+        # then runs of increasing positions, so its gathers and vote
+        # updates walk memory forward instead of jumping around.
+        pts = np.take(xyz, index.order, axis=0)
+        cell_votes = np.zeros(N, dtype=np.int32)
+        for c, rect in enumerate(views.mask_rects()):
+            if rect is None:
+                continue  # no dynamic pixels, no votes from this camera
+            pos = index.positions_in_cells(index.cells_in_view(views.P[c], rect))
+            metrics.count("culled_projections", N - pos.size)
+            if pos.size == 0:
+                continue
+            pix = project_pixel_indices(views.P[c:c + 1], np.take(pts, pos, axis=0),
+                                        views.sizes[c:c + 1], chunk_size)[0]
+            gidx = _gather_indices(views, pix, c)
+            hits = views.mask_flat[gidx]
+            cell_votes[pos] += hits
+
+            if metrics.debug:
+                valid_hits[c] += np.count_nonzero(pix >= 0)
+                dynamic_hits[c] += np.count_nonzero(hits)
+        dynamic_votes[index.order] = cell_votes
+    else:
+        # Invalid pairs read the zero sentinel instead of being compacted
+        # out, so the gather stays a single dense take.
+        _count_votes_dense(xyz, views, dynamic_votes, chunk_size, workspace or thread_workspace(),
+                           *((valid_hits, dynamic_hits) if metrics.debug else ()))
+
+    if metrics.debug:
+        metrics.add("valid_hits_per_camera", valid_hits)
+        metrics.add("dynamic_hits_per_camera", dynamic_hits)
+    return dynamic_votes
+
+
+def count_votes_active(xyz, views, thresh, group=ACTIVE_CAMERA_GROUP, chunk_size=PROJECTION_CHUNK,
+                       metrics=NULL_METRICS):
+    """
+    count_votes that stops counting once a splat's label is decided.
+    Cameras are walked in order of how many dynamic pixels their masks
+    hold (empty masks cannot vote and are skipped), `group` at a time.
+    Before each group, splats that already reached thresh, and splats that
+    cannot reach it with the cameras left, leave the active set, so later
+    cameras project fewer and fewer splats.
+    Votes are exact only for splats active to the end; for the others they
+    are just known to be >= thresh or < thresh, which is all
+    `votes >= thresh` needs. With metrics.debug every vote is counted by
+    count_votes instead, so the vote histogram and the per-camera hit
+    counts stay exact.
+    """
+    if metrics.debug:
+        return count_votes(xyz, views, chunk_size, metrics=metrics)
+
+    N = xyz.shape[0]
+    dynamic_votes = np.zeros(N, dtype=np.int32)
+    sentinel = views.mask_flat.size - 1
+
+    pixels = np.add.reduceat(views.mask_flat, views.offsets, dtype=np.int64)
+    cameras = [c for c in np.argsort(-pixels, kind="stable") if pixels[c] > 0]
+
+    active = np.arange(N)
+    votes = np.zeros(N, dtype=np.int32)  # votes of the active splats
+    pts = xyz
+    remaining = len(cameras)
+    for start in range(0, len(cameras), group):
+        decided = (votes >= thresh) | (votes + remaining < thresh)
+        n_decided = np.count_nonzero(decided)
+        # Compacting costs a copy of the active set, so it waits until it
+        # pays off. Decided splats left in stay decided: votes only grow,
+        # and never by more than the cameras remaining.
+        if n_decided == active.size:
+            break
+        if n_decided * ACTIVE_COMPACT_RATIO >= active.size:
+            dynamic_votes[active[decided]] = votes[decided]
+            undecided = ~decided
+            active, votes, pts = active[undecided], votes[undecided], pts[undecided]
+
+        cams_g = cameras[start:start + group]
+        remaining -= len(cams_g)
+        metrics.count("active_projections", active.size * len(cams_g))
+        pix = project_pixel_indices(views.P[cams_g], pts, views.sizes[cams_g], chunk_size)
+        gidx = np.where(pix >= 0, pix + views.offsets[cams_g][:, None], sentinel)
+        votes += views.mask_flat[gidx].sum(axis=0, dtype=np.int32)
+    dynamic_votes[active] = votes
+    return dynamic_votes
+
+
+# Shared-memory blocks a pool worker has attached, by role.
+_SHARD_BLOCKS = {}
+
+
+def _attach_block(role, name):
+    block = _SHARD_BLOCKS.get(role)
+    if block is None or block.name != name:
+        if block is not None:
+            block.close()  # the pool grew it; the old one is gone
+        block = _SHARD_BLOCKS[role] = shared_memory.SharedMemory(name)
+    return block
+
+
+def _count_shard_votes(task):
+    """
+    Pool worker: votes of one camera shard into its row of the shared vote
+    array. With debug, returns the shard's (valid_hits, dynamic_hits) per
+    camera, else None.
+    """
+    names, N, mask_size, P, offsets, sizes, row, chunk_size, debug = task
+    xyz = np.ndarray((N, 3), dtype=np.float32, buffer=_attach_block("xyz", names[0]).buf)
+    mask_flat = np.ndarray(mask_size, dtype=np.uint8, buffer=_attach_block("masks", names[1]).buf)
+    votes = np.ndarray((row + 1, N), dtype=np.int32, buffer=_attach_block("votes", names[2]).buf)
+    views = FrameViews.from_buffers(P, mask_flat, offsets, sizes)
+    hits = (np.zeros(P.shape[0], dtype=np.int64), np.zeros(P.shape[0], dtype=np.int64)) if debug else ()
+    _count_votes_dense(xyz, views, votes[row], chunk_size, thread_workspace(), *hits)
+    return hits or None
+
+
+class CameraShardPool:
+    """
+    Worker processes that split one frame's cameras between them, for the
+    latency of a single large frame (spreading frames over workers does
+    nothing for that). Positions and masks are copied once into shared
+    memory, every worker writes its shard's votes into its own row of a
+    shared (workers, N) vote array, and the rows are summed at the end.
+    Cameras whose masks are empty cannot vote and are left out, except
+    with metrics.debug, where every camera's hit counts are recorded.
+    The blocks are kept and grown across frames. close() frees them and
+    stops the workers; so does dropping the last reference to the pool.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        # Workers must share this process's resource tracker; one started
+        # in a worker would unlink the blocks when that worker exits.
+        resource_tracker.ensure_running()
+        self.pool = mp.Pool(workers)
+        self._blocks = {}
+        self._finalizer = weakref.finalize(self, CameraShardPool._shutdown, self.pool, self._blocks)
+
+    @staticmethod
+    def _shutdown(pool, blocks):
+        pool.close()
+        pool.join()
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+        blocks.clear()
 
+    def _block(self, role, nbytes):
+        block = self._blocks.get(role)
+        if block is None or block.size < nbytes:
+            if block is not None:
+                block.close()
+                block.unlink()
+            block = self._blocks[role] = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        return block
 
-def classify_splats(gaussians, cams, masks, thresh=2):
-    xyz = np.stack([gaussians["x"], gaussians["y"], gaussians["z"]], axis=-1)
+    def count_votes(self, xyz, views, chunk_size=PROJECTION_CHUNK, metrics=NULL_METRICS):
+        """count_votes with the cameras split across the pool."""
+        N = xyz.shape[0]
+        mask_size = views.mask_flat.size
+        pixels = np.add.reduceat(views.mask_flat, views.offsets, dtype=np.int64)
+        cameras = np.arange(pixels.size) if metrics.debug else np.flatnonzero(pixels)
+        shards = [s for s in np.array_split(cameras, self.workers) if s.size]
+        if not shards:
+            return np.zeros(N, dtype=np.int32)
+
+        xyz_block = self._block("xyz", N * 3 * 4)
+        mask_block = self._block("masks", mask_size)
+        votes_block = self._block("votes", len(shards) * N * 4)
+        shared_xyz = np.ndarray((N, 3), dtype=np.float32, buffer=xyz_block.buf)
+        shared_masks = np.ndarray(mask_size, dtype=np.uint8, buffer=mask_block.buf)
+        with metrics.timer("classify.share"):
+            np.copyto(shared_xyz, xyz, casting="same_kind")
+            shared_masks[:] = views.mask_flat
+
+        names = (xyz_block.name, mask_block.name, votes_block.name)
+        tasks = [(names, N, mask_size, views.P[cams], views.offsets[cams], views.sizes[cams], row,
+                  chunk_size, metrics.debug) for row, cams in enumerate(shards)]
+        results = self.pool.map(_count_shard_votes, tasks)
+        metrics.count("camera_shards", len(shards))
+
+        if metrics.debug:
+            C = pixels.size
+            valid_hits = np.zeros(C, dtype=np.int64)
+            dynamic_hits = np.zeros(C, dtype=np.int64)
+            for cams, (valid, dynamic) in zip(shards, results):
+                valid_hits[cams] = valid
+                dynamic_hits[cams] = dynamic
+            metrics.add("valid_hits_per_camera", valid_hits)
+            metrics.add("dynamic_hits_per_camera", dynamic_hits)
+
+        votes = np.ndarray((len(shards), N), dtype=np.int32, buffer=votes_block.buf)
+        return votes.sum(axis=0, dtype=np.int32)
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _gather_indices(views, pix, c=None):
+    """Pixel indices (C,n) -> indices into views.mask_flat, -1 -> the zero sentinel."""
+    offsets = views.offsets[:, None] if c is None else views.offsets[c]
+    return np.where(pix >= 0, pix + offsets, views.mask_flat.size - 1)
+
+
+class ProjectionCache:
+    """
+    Every splat's mask-buffer index in every camera, kept from frame to
+    frame. The cameras are fixed for a sequence, so a splat whose position
+    is bit-identical to the previous frame's lands on the same pixels: only
+    new or moved splats are projected again, the rest is a plain gather.
+    Memory is 4 bytes per splat and camera plus the positions.
+    """
+
+    def __init__(self):
+        self.xyz = None
+        self.gidx = None  # (C,N) int32 indices into FrameViews.mask_flat
+        self._layout = None
+
+    def gather_indices(self, xyz, views, chunk_size=PROJECTION_CHUNK, metrics=NULL_METRICS):
+        """(C,N) indices into views.mask_flat for xyz, reprojecting only what moved."""
+        xyz = np.ascontiguousarray(xyz, dtype=np.float32)
+        # Indices are only valid for the same projections and mask layout.
+        layout = (views.P.tobytes(), views.sizes.tobytes())
+
+        if self.gidx is None or layout != self._layout or self.xyz.shape != xyz.shape:
+            self.gidx = np.empty((views.P.shape[0], xyz.shape[0]), dtype=np.int32)
+            for start in range(0, xyz.shape[0], chunk_size):
+                stop = min(start + chunk_size, xyz.shape[0])
+                pix = project_pixel_indices(views.P, xyz[start:stop], views.sizes, chunk_size)
+                self.gidx[:, start:stop] = _gather_indices(views, pix)
+            self.xyz = xyz.copy()
+            self._layout = layout
+            metrics.count("projected_splats", xyz.shape[0])
+            return self.gidx
+
+        # Compared as bits: exact, and NaN never matches so it is reprojected.
+        moved = np.flatnonzero((self.xyz.view(np.uint32) != xyz.view(np.uint32)).any(axis=1))
+        if moved.size:
+            pix = project_pixel_indices(views.P, xyz[moved], views.sizes, chunk_size)
+            self.gidx[:, moved] = _gather_indices(views, pix)
+            self.xyz[moved] = xyz[moved]
+        metrics.count("projected_splats", moved.size)
+        metrics.count("cached_splats", xyz.shape[0] - moved.size)
+        return self.gidx
+
+
+class GridCache:
+    """
+    The VoxelGrid of the previous frame, kept for the next one. A sequence
+    keeps its splats in the same order and mostly in place, so a later frame
+    only refits the cells' bounds (VoxelGrid.refit) instead of sorting every
+    splat into cells again. The grid is rebuilt when the splat count changes
+    or the refitted cells have grown too loose. The grid costs about 8
+    bytes per splat, so it is for whole frames, not streamed chunks.
+    """
+
+    def __init__(self):
+        self.grid = None
+
+    def grid_for(self, xyz, metrics=NULL_METRICS):
+        """A VoxelGrid over xyz, refitted from the previous frame when possible."""
+        grid = self.grid
+        if grid is not None and grid.num_points == xyz.shape[0] and grid.refit(xyz):
+            metrics.count("grid_refits")
+            return grid
+        self.grid = VoxelGrid(xyz)
+        metrics.count("grid_builds")
+        return self.grid
+
+
+def count_cached_votes(xyz, views, cache, chunk_size=PROJECTION_CHUNK, metrics=NULL_METRICS):
+    """count_votes through a ProjectionCache; gives the same votes."""
+    gidx = cache.gather_indices(xyz, views, chunk_size, metrics)
     N = xyz.shape[0]
+    dynamic_votes = np.zeros(N, dtype=np.int32)
+
+    C = views.P.shape[0]
+    if metrics.debug:
+        valid_hits = np.zeros(C, dtype=np.int64)
+        dynamic_hits = np.zeros(C, dtype=np.int64)
+
+    sentinel = views.mask_flat.size - 1
+    for start in range(0, N, chunk_size):
+        stop = min(start + chunk_size, N)
+        hits = views.mask_flat.take(gidx[:, start:stop])
+        dynamic_votes[start:stop] = hits.sum(axis=0, dtype=np.int32)
+
+        if metrics.debug:
+            valid_hits += np.count_nonzero(gidx[:, start:stop] != sentinel, axis=1)
+            dynamic_hits += np.count_nonzero(hits, axis=1)
 
+    if metrics.debug:
+        metrics.add("valid_hits_per_camera", valid_hits)
+        metrics.add("dynamic_hits_per_camera", dynamic_hits)
+    return dynamic_votes
+
+
+def count_footprint_votes(xyz, radii, views, chunk_size=PROJECTION_CHUNK,
+                          coverage=FOOTPRINT_COVERAGE, metrics=NULL_METRICS):
+    """
+    Like count_votes, but each camera looks at the whole projected footprint
+    of a splat (radius radii (N,) in world units) instead of its center
+    pixel, and votes dynamic when at least `coverage` of that box is dynamic.
+    Every box sum is four summed-area-table reads, so the cost does not
+    depend on the footprint size.
+    """
+    N = xyz.shape[0]
     dynamic_votes = np.zeros(N, dtype=np.int32)
+    sat, sat_offsets = views.integral()
+    # int32 index math halves the traffic of the (C, chunk) temporaries.
+    base = sat_offsets.astype(np.int32)[:, None]
+    stride = (views.sizes[:, 1] + 1).astype(np.int32)[:, None]
 
-    for cam, mask in zip(cams, masks):
-        uv, depth = project_points(cam.K, cam.R, cam.T, xyz)
-
-        # === FIX: SCALE UV TO MASK RESOLUTION ===
-        H_mask, W_mask = mask.shape
-        H_cam, W_cam = cam.height, cam.width
-        
-        scale_x = W_mask / W_cam  # 640 / 3840 ≈ 0.167
-        scale_y = H_mask / H_cam  # 384 / 2160 ≈ 0.178
-        
-        u_scaled = uv[:, 0] * scale_x
-        v_scaled = uv[:, 1] * scale_y
-        # === END FIX ===
-        
-        # USE THE SCALED COORDINATES!
-        u_i = np.floor(u_scaled).astype(np.int32)  # Changed from u_f to u_scaled
-        v_i = np.floor(v_scaled).astype(np.int32)  # Changed from v_f to v_scaled
-
-        H, W = mask.shape
-
-        # Validity check with mask dimensions
-        valid = (
-            (depth > 0) &
-            (u_i >= 0) & (u_i < W) &
-            (v_i >= 0) & (v_i < H)
-        )
-
-        valid_idx = np.where(valid)[0]
-        if len(valid_idx) == 0:
-            continue
-
-        # SAFE indexing
-        sample_u = u_i[valid_idx]
-        sample_v = v_i[valid_idx]
-
-        # Sample the mask
-        sampled_mask = mask[sample_v, sample_u]
-
-        dynamic_votes[valid_idx] += (sampled_mask > 0).astype(np.int32)
-
-    # After all cameras
-    max_votes = np.max(dynamic_votes)
-    total_dynamic_splats = np.sum(dynamic_votes >= thresh)
-    print(f"[DEBUG] Max votes for any splat: {max_votes}")
-    print(f"[DEBUG] Splats meeting threshold ({thresh}): {total_dynamic_splats}")
-    
-    # Add vote distribution
-    unique, counts = np.unique(dynamic_votes, return_counts=True)
-    print(f"[DEBUG] Vote distribution: {dict(zip(unique, counts))}")
+    C = views.P.shape[0]
+    if metrics.debug:
+        valid_hits = np.zeros(C, dtype=np.int64)
+        dynamic_hits = np.zeros(C, dtype=np.int64)
+
+    for start in range(0, N, chunk_size):
+        stop = min(start + chunk_size, N)
+        u0, v0, u1, v1, valid = project_footprint_boxes(views.P, views.focal, xyz[start:stop],
+                                                        radii[start:stop], views.sizes)
+
+        # Inclusive box [u0, u1] x [v0, v1] -> table rows v0 and v1 + 1,
+        # columns u0 and u1 + 1.
+        height = v1 - v0 + 1
+        width = u1 - u0 + 1
+        top = v0 * stride + base
+        top += u0
+        bottom = height * stride + top
+        dynamic = sat.take(bottom + width) - sat.take(top + width)
+        dynamic -= sat.take(bottom)
+        dynamic += sat.take(top)
+        area = height * width
+
+        hits = valid & (dynamic >= coverage * area)
+        dynamic_votes[start:stop] = hits.sum(axis=0, dtype=np.int32)
+
+        if metrics.debug:
+            valid_hits += np.count_nonzero(valid, axis=1)
+            dynamic_hits += np.count_nonzero(hits, axis=1)
+
+    if metrics.debug:
+        metrics.add("valid_hits_per_camera", valid_hits)
+        metrics.add("dynamic_hits_per_camera", dynamic_hits)
+    return dynamic_votes
+
+
+def _record_votes(metrics, dynamic_votes, dynamic_mask):
+    metrics.count("splats", dynamic_votes.shape[0])
+    metrics.count("votes", dynamic_votes.sum(dtype=np.int64))
+    metrics.count("dynamic_splats", np.count_nonzero(dynamic_mask))
+
+    if metrics.debug:
+        # bincount is O(N); the old np.unique histogram sorted every frame
+        hist = np.bincount(dynamic_votes)
+        metrics.add("vote_histogram", hist)
+        return hist
+    return None
+
+
+class StaticConsensus:
+    """
+    Running per-splat statistics for a Static_Master chosen across frames.
+
+    Needs frames that share splat order, as a 4D export does (splat i of
+    every frame is the same Gaussian). Memory is one counter per splat:
+    uint8, or uint16 for sequences longer than 255 frames.
+    """
+
+    def __init__(self, count, num_frames):
+        dtype = np.uint8 if num_frames <= np.iinfo(np.uint8).max else np.uint16
+        self.dynamic_frames = np.zeros(count, dtype=dtype)
+        self.frames = 0
+
+    def add(self, dynamic_mask, start=0):
+        """Count one frame's dynamic splats; start offsets a streamed chunk."""
+        counts = self.dynamic_frames[start:start + dynamic_mask.shape[0]]
+        if counts.shape != dynamic_mask.shape:
+            raise ValueError(f"Frame has more splats than the consensus ({self.dynamic_frames.size}); "
+                             "consensus needs frames that share splat order")
+        counts += dynamic_mask
+
+    def end_frame(self):
+        self.frames += 1
+
+    def static_mask(self, max_dynamic=CONSENSUS_MAX_DYNAMIC):
+        return self.dynamic_frames <= max_dynamic * self.frames
+
+
+def classify_splats(gaussians, cams, masks, thresh=2, chunk_size=PROJECTION_CHUNK, cull=False,
+                    metrics=NULL_METRICS, rig=None, footprint=False, cache=None, early_exit=False,
+                    shards=None, grids=None):
+    """
+    Vote each splat dynamic/static against every camera's mask.
+    gaussians: GAUSSIAN_DTYPE array or GaussianCloud; only its positions
+    (and with footprint=True its scales) are read.
+    cull=True builds a VoxelGrid over the splats and frustum-culls whole
+    cells per camera before projecting.
+    grids: optional GridCache reused across the frames of a sequence, so
+    cull refits the previous frame's grid instead of building one.
+    rig: optional camera_rig.CameraRig with precompiled projections.
+    footprint=True samples each splat's projected footprint instead of its
+    center pixel (see count_footprint_votes); cull is not applied then.
+    cache: optional ProjectionCache reused across the frames of a sequence;
+    it replaces cull, and is not used with footprint=True.
+    early_exit=True stops projecting a splat once its label is decided (see
+    count_votes_active); labels are unchanged. Debug runs count every vote,
+    so they do not exit early. It replaces cull, and is not used with
+    footprint=True or a cache.
+    shards: optional CameraShardPool that splits the cameras across worker
+    processes. It takes the place of cull; footprint, cache and early_exit
+    take precedence over it.
+    """
+    cloud = as_gaussian_cloud(gaussians)
+    xyz = cloud.positions
+
+    with metrics.timer("classify.setup"):
+        views = FrameViews(cams, masks, rig)
+        use_cache = cache is not None and not footprint
+        use_active = early_exit and not footprint and not use_cache
+        use_shards = shards is not None and not footprint and not use_cache and not use_active
+        index = ((grids.grid_for(xyz, metrics) if grids is not None else VoxelGrid(xyz))
+                 if cull and not footprint and not use_cache and not use_active and not use_shards
+                 else None)
+
+    with metrics.timer("classify.votes"):
+        if footprint:
+            dynamic_votes = count_footprint_votes(xyz, footprint_radii(cloud["scale"]), views,
+                                                  chunk_size, metrics=metrics)
+        elif use_cache:
+            dynamic_votes = count_cached_votes(xyz, views, cache, chunk_size, metrics)
+        elif use_active:
+            dynamic_votes = count_votes_active(xyz, views, thresh, chunk_size=chunk_size, metrics=metrics)
+        elif use_shards:
+            dynamic_votes = shards.count_votes(xyz, views, chunk_size, metrics)
+        else:
+            dynamic_votes = count_votes(xyz, views, chunk_size, index, metrics)
 
     dynamic_mask = dynamic_votes >= thresh
     static_mask = ~dynamic_mask
 
-    return static_mask, dynamic_mask
\ No newline at end of file
+    hist = _record_votes(metrics, dynamic_votes, dynamic_mask)
+    if hist is not None:
+        print(f"[DEBUG] Max votes for any splat: {hist.size - 1}")
+        print(f"[DEBUG] Splats meeting threshold ({thresh}): {int(hist[thresh:].sum())}")
+        print(f"[DEBUG] Vote distribution: {dict(enumerate(hist.tolist()))}")
+
+    return static_mask, dynamic_mask
+
+
+def classify_ply_streaming(ply_path, cams, masks, static_path=None, dynamic_path=None,
+                           thresh=2, chunk_size=STREAM_CHUNK, cull=False, metrics=NULL_METRICS,
+                           rig=None, footprint=False, consensus=None, early_exit=False, shards=None):
+    """
+    Out-of-core classify_splats: read ply_path chunk by chunk and stream
+    static/dynamic records straight to their PLYs (either may be None).
+    Peak memory is bounded by chunk_size, not by the splat count.
+    consensus: optional StaticConsensus that each chunk's dynamic mask is
+    added to. early_exit, shards: as in classify_splats. With cull, every
+    chunk gets its own VoxelGrid, dropped with the chunk.
+    Returns (static_count, dynamic_count).
+    """
+    views = FrameViews(cams, masks, rig)
+    static_out = PlyStreamWriter(static_path) if static_path else None
+    dynamic_out = PlyStreamWriter(dynamic_path) if dynamic_path else None
+    static_count = dynamic_count = 0
+
+    try:
+        for chunk in iter_ply_chunks(ply_path, chunk_size):
+            cloud = GaussianCloud(chunk)
+            xyz = cloud.positions
+            index = None
+            if cull and not footprint and not early_exit and shards is None:
+                with metrics.timer("classify.setup"):
+                    index = VoxelGrid(xyz)
+            with metrics.timer("classify.votes"):
+                if footprint:
+                    dynamic_votes = count_footprint_votes(xyz, footprint_radii(cloud["scale"]), views,
+                                                          metrics=metrics)
+                elif early_exit:
+                    dynamic_votes = count_votes_active(xyz, views, thresh, metrics=metrics)
+                elif shards is not None:
+                    dynamic_votes = shards.count_votes(xyz, views, metrics=metrics)
+                else:
+                    dynamic_votes = count_votes(xyz, views, index=index, metrics=metrics)
+            dynamic_mask = dynamic_votes >= thresh
+            _record_votes(metrics, dynamic_votes, dynamic_mask)
+
+            if consensus is not None:
+                consensus.add(dynamic_mask, static_count + dynamic_count)
+
+            n_dyn = int(np.count_nonzero(dynamic_mask))
+            dynamic_count += n_dyn
+            static_count += chunk.shape[0] - n_dyn
+
+            if static_out is not None:
+                static_out.write(cloud.select(~dynamic_mask))
+            if dynamic_out is not None:
+                dynamic_out.write(cloud.select(dynamic_mask))
+    finally:
+        if static_out is not None:
+            static_out.close()
+        if dynamic_out is not None:
+            dynamic_out.close()
+
+    return static_count, dynamic_count
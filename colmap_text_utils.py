@@ -22,7 +22,51 @@ def read_cameras_text(path):
     return cameras
 
 
-def read_images_text(path):
+def iter_images_text(path, points2D=False):
+    """
+    Stream COLMAP images.txt one image at a time.
+    Yields dicts {'image_id', 'qvec', 'tvec', 'camera_id', 'name'}.
+
+    images.txt alternates a header line and a POINTS2D line (which may be
+    empty). The POINTS2D line is skipped without being tokenized unless
+    points2D=True, in which case it is parsed in one numpy call into
+    'points2D_xy' (M,2) and 'points2D_point3D_ids' (M,).
+    """
+    with open(path, "r") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            header = line.strip()
+            if header == "":
+                continue
+
+            # The very next line belongs to this image, even when empty.
+            points_line = next(f, "")
+
+            toks = header.split(None, 9)
+            if len(toks) < 10:
+                continue
+            image = {
+                "image_id": int(toks[0]),
+                "qvec": np.array(toks[1:5], dtype=float),
+                "tvec": np.array(toks[5:8], dtype=float),
+                "camera_id": int(toks[8]),
+                "name": toks[9],  # image file name (may contain spaces, but usually doesn't)
+            }
+
+            if points2D:
+                points_line = points_line.strip()
+                if points_line:
+                    vals = np.fromstring(points_line, dtype=float, sep=" ").reshape(-1, 3)
+                else:
+                    vals = np.zeros((0, 3))
+                image["points2D_xy"] = vals[:, :2]
+                image["points2D_point3D_ids"] = vals[:, 2].astype(np.int64)
+
+            yield image
+
+
+def read_images_text(path, points2D=False):
     """
     COLMAP images.txt text format.
     Returns dict: image_id -> {
@@ -31,26 +75,54 @@ def read_images_text(path):
         'camera_id': int,
         'name': str,
     }
+    (plus 'points2D_xy' / 'points2D_point3D_ids' with points2D=True)
+    """
+    return {img["image_id"]: img for img in iter_images_text(path, points2D)}
+
+
+def read_points3D_text(path, tracks=False):
     """
-    images = {}
+    COLMAP points3D.txt text format, parsed in bulk.
+    Returns dict of columns:
+        point3D_ids (N,), xyz (N,3), rgb (N,3) uint8, errors (N,),
+        track_lengths (N,)
+    and with tracks=True the tracks in CSR form:
+        track_offsets (N+1,), track_image_ids (M,), track_point2D_idxs (M,)
+    """
+    heads = []
+    lengths = []
+    track_tokens = []
     with open(path, "r") as f:
-        lines = [l.strip() for l in f if l.strip() != "" and l.strip()[0] != "#"]
-
-    # images.txt has pairs of lines: meta line, then 2D points line.
-    # We only care about the meta lines (even indices: 0,2,4,...).
-    for i in range(0, len(lines), 2):
-        toks = lines[i].split()
-        if len(toks) < 10:
-            continue
-        image_id = int(toks[0])
-        qvec = np.array(list(map(float, toks[1:5])), dtype=float)
-        tvec = np.array(list(map(float, toks[5:8])), dtype=float)
-        camera_id = int(toks[8])
-        name = " ".join(toks[9:])  # image file name (may contain spaces, but usually doesn't)
-        images[image_id] = {
-            "qvec": qvec,
-            "tvec": tvec,
-            "camera_id": camera_id,
-            "name": name,
-        }
-    return images
\ No newline at end of file
+        for line in f:
+            if line.startswith("#"):
+                continue
+            # Split off the 8 fixed columns; the track stays one string.
+            parts = line.split(None, 8)
+            if len(parts) < 8:
+                continue
+            heads.append(" ".join(parts[:8]))
+
+            track = parts[8].strip() if len(parts) > 8 else ""
+            # (IMAGE_ID, POINT2D_IDX) pairs, counted without tokenizing
+            lengths.append((track.count(" ") + 1) // 2 if track else 0)
+            if tracks:
+                track_tokens.append(track)
+
+    N = len(heads)
+    fixed = np.fromstring(" ".join(heads), dtype=float, sep=" ").reshape(N, 8)
+    lengths = np.array(lengths, dtype=np.int64)
+    cols = {
+        "point3D_ids": fixed[:, 0].astype(np.int64),
+        "xyz": fixed[:, 1:4].copy(),
+        "rgb": fixed[:, 4:7].astype(np.uint8),
+        "errors": fixed[:, 7].copy(),
+        "track_lengths": lengths,
+    }
+
+    if tracks:
+        elems = np.fromstring(" ".join(track_tokens), dtype=np.int64, sep=" ").reshape(-1, 2)
+        cols["track_offsets"] = np.concatenate([[0], np.cumsum(lengths)])
+        cols["track_image_ids"] = elems[:, 0].astype(np.int32)
+        cols["track_point2D_idxs"] = elems[:, 1].astype(np.int32)
+
+    return cols
@@ -4,6 +4,129 @@ import numpy as np
 from scipy.spatial.transform import Rotation as R
 
 
+# COLMAP camera model id -> (name, number of params), as in
+# colmap/src/colmap/sensor/models.h
+CAMERA_MODELS = {
+    0: ("SIMPLE_PINHOLE", 3),
+    1: ("PINHOLE", 4),
+    2: ("SIMPLE_RADIAL", 4),
+    3: ("RADIAL", 5),
+    4: ("OPENCV", 8),
+    5: ("OPENCV_FISHEYE", 8),
+    6: ("FULL_OPENCV", 12),
+    7: ("FOV", 5),
+    8: ("SIMPLE_RADIAL_FISHEYE", 4),
+    9: ("RADIAL_FISHEYE", 5),
+    10: ("THIN_PRISM_FISHEYE", 12),
+}
+
+# Fixed-width heads of the variable-length binary records.
+IMAGE_HEAD_DTYPE = np.dtype([
+    ("image_id", "<u4"),
+    ("qvec", "<f8", (4,)),
+    ("tvec", "<f8", (3,)),
+    ("camera_id", "<u4"),
+])
+
+POINT3D_HEAD_DTYPE = np.dtype([
+    ("point3D_id", "<u8"),
+    ("xyz", "<f8", (3,)),
+    ("rgb", "u1", (3,)),
+    ("error", "<f8"),
+    ("track_length", "<u8"),
+])
+
+POINT2D_DTYPE = np.dtype([
+    ("xy", "<f8", (2,)),
+    ("point3D_id", "<i8"),
+])
+
+TRACK_ELEM_DTYPE = np.dtype([
+    ("image_id", "<i4"),
+    ("point2D_idx", "<i4"),
+])
+
+_U64 = struct.Struct("<Q")
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _gather_records(buf, offsets, dtype):
+    """Decode the fixed-width record heads starting at offsets in one pass."""
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    idx = np.asarray(offsets, dtype=np.int64)[:, None] + np.arange(dtype.itemsize)
+    return np.ascontiguousarray(raw[idx]).view(dtype).reshape(-1)
+
+
+def _gather_ranges(buf, starts, lengths, dtype):
+    """Concatenate len-element runs of dtype starting at byte offsets starts."""
+    starts = np.asarray(starts, dtype=np.int64)
+    n_bytes = np.asarray(lengths, dtype=np.int64) * dtype.itemsize
+    total = int(n_bytes.sum())
+    if total == 0:
+        return np.zeros(0, dtype=dtype)
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    run_offsets = np.cumsum(n_bytes) - n_bytes
+    pos = np.repeat(starts - run_offsets, n_bytes) + np.arange(total)
+    return raw[pos].view(dtype)
+
+
+def read_images_binary_columns(path, points2D=True):
+    """
+    Buffer-based COLMAP images.bin reader.
+    points2D=False reads the custom layout without per-image 2D points
+    (what read_images_custom_bin has always expected).
+    Returns dict of columns:
+        image_ids (N,), qvecs (N,4) [w,x,y,z], tvecs (N,3), camera_ids (N,),
+        names [str]*N
+    and with points2D=True also the 2D points in CSR form:
+        points2D_offsets (N+1,), points2D_xy (M,2), points2D_point3D_ids (M,)
+    """
+    buf = _read_file(path)
+    num_images = _U64.unpack_from(buf, 0)[0]
+
+    heads = np.empty(num_images, dtype=np.int64)
+    names = []
+    pts_starts = np.empty(num_images, dtype=np.int64)
+    pts_counts = np.zeros(num_images, dtype=np.int64)
+
+    # Only the record boundaries need a sequential scan; everything
+    # fixed-width is decoded afterwards in bulk.
+    off = 8
+    for i in range(num_images):
+        heads[i] = off
+        name_start = off + IMAGE_HEAD_DTYPE.itemsize
+        name_end = buf.index(b"\x00", name_start)
+        names.append(buf[name_start:name_end].decode("utf-8"))
+        off = name_end + 1
+
+        if points2D:
+            n = _U64.unpack_from(buf, off)[0]
+            pts_starts[i] = off + 8
+            pts_counts[i] = n
+            off += 8 + n * POINT2D_DTYPE.itemsize
+
+    rec = _gather_records(buf, heads, IMAGE_HEAD_DTYPE)
+    cols = {
+        "image_ids": rec["image_id"].copy(),
+        "qvecs": rec["qvec"].copy(),
+        "tvecs": rec["tvec"].copy(),
+        "camera_ids": rec["camera_id"].copy(),
+        "names": names,
+    }
+
+    if points2D:
+        pts = _gather_ranges(buf, pts_starts, pts_counts, POINT2D_DTYPE)
+        cols["points2D_offsets"] = np.concatenate([[0], np.cumsum(pts_counts)])
+        cols["points2D_xy"] = pts["xy"].copy()
+        cols["points2D_point3D_ids"] = pts["point3D_id"].copy()
+
+    return cols
+
+
 def read_images_custom_bin(path):
     """
     Custom reader for COLMAP images.bin.
@@ -15,78 +138,153 @@ def read_images_custom_bin(path):
             'name': str,
         }
     """
+    cols = read_images_binary_columns(path, points2D=False)
+    if len(cols["names"]) == 0:
+        return {}
+
+    # scipy wants scalar-last quaternions; convert every image at once.
+    rots = R.from_quat(cols["qvecs"][:, [1, 2, 3, 0]]).as_matrix()
+
     images = {}
-    with open(path, "rb") as f:
-        num_images = struct.unpack("<Q", f.read(8))[0]
-
-        for _ in range(num_images):
-            image_id = struct.unpack("<I", f.read(4))[0]
-            qw, qx, qy, qz = struct.unpack("<dddd", f.read(32))
-            tx, ty, tz = struct.unpack("<ddd", f.read(24))
-            camera_id = struct.unpack("<I", f.read(4))[0]
-
-            # read name until null terminator
-            name_bytes = []
-            while True:
-                c = f.read(1)
-                if c == b"\x00":
-                    break
-                name_bytes.append(c)
-            name = b"".join(name_bytes).decode("utf-8")
-
-            rot = R.from_quat([qx, qy, qz, qw]).as_matrix()
-
-            images[image_id] = {
-                "R": rot,
-                "T": np.array([tx, ty, tz], dtype=float),
-                "camera_id": camera_id,
-                "name": name,
-            }
+    for i, image_id in enumerate(cols["image_ids"].tolist()):
+        images[image_id] = {
+            "R": rots[i],
+            "T": cols["tvecs"][i],
+            "camera_id": int(cols["camera_ids"][i]),
+            "name": cols["names"][i],
+        }
 
     return images
 
 
+def read_cameras_binary_columns(path):
+    """
+    Buffer-based COLMAP cameras.bin reader.
+    Returns dict of columns:
+        camera_ids (C,), model_ids (C,), widths (C,), heights (C,),
+        params (C, P) with rows NaN-padded to the longest model,
+        num_params (C,)
+    """
+    buf = _read_file(path)
+    num_cams = _U64.unpack_from(buf, 0)[0]
+
+    head = struct.Struct("<IiQQ")
+    camera_ids = np.empty(num_cams, dtype=np.uint32)
+    model_ids = np.empty(num_cams, dtype=np.int32)
+    widths = np.empty(num_cams, dtype=np.uint64)
+    heights = np.empty(num_cams, dtype=np.uint64)
+    num_params = np.empty(num_cams, dtype=np.int32)
+    param_offsets = np.empty(num_cams, dtype=np.int64)
+
+    off = 8
+    for i in range(num_cams):
+        camera_ids[i], model_ids[i], widths[i], heights[i] = head.unpack_from(buf, off)
+        if model_ids[i] not in CAMERA_MODELS:
+            raise RuntimeError(f"Unsupported camera model id {model_ids[i]}")
+        num_params[i] = CAMERA_MODELS[model_ids[i]][1]
+        param_offsets[i] = off + head.size
+        off = param_offsets[i] + 8 * num_params[i]
+
+    P = int(num_params.max()) if num_cams else 0
+    params = np.full((num_cams, P), np.nan)
+    for i in range(num_cams):
+        params[i, :num_params[i]] = np.frombuffer(buf, dtype="<f8", count=num_params[i],
+                                                  offset=param_offsets[i])
+
+    return {
+        "camera_ids": camera_ids,
+        "model_ids": model_ids,
+        "widths": widths,
+        "heights": heights,
+        "params": params,
+        "num_params": num_params,
+    }
+
 
 def read_cameras_binary(path):
     """
     Standard COLMAP cameras.bin reader
     """
+    cols = read_cameras_binary_columns(path)
+
     cameras = {}
-    with open(path, "rb") as f:
-        num_cams = struct.unpack("<Q", f.read(8))[0]
-        for _ in range(num_cams):
-            cam_id = struct.unpack("<I", f.read(4))[0]
-            model = struct.unpack("<I", f.read(4))[0]
-            width = struct.unpack("<Q", f.read(8))[0]
-            height = struct.unpack("<Q", f.read(8))[0]
-
-            # number of parameters depends on model
-            if model == 1:      # SIMPLE_PINHOLE
-                num_params = 3
-            elif model == 2:    # PINHOLE
-                num_params = 4
-            elif model == 3:    # SIMPLE_RADIAL
-                num_params = 4
-            else:
-                raise RuntimeError(f"Unsupported camera model id {model}")
-
-            params = struct.unpack("<" + "d"*num_params, f.read(8*num_params))
-
-            cameras[cam_id] = {
-                "model_id": model,
-                "width": width,
-                "height": height,
-                "params": np.array(params),
-            }
+    for i, cam_id in enumerate(cols["camera_ids"].tolist()):
+        cameras[cam_id] = {
+            "model_id": int(cols["model_ids"][i]),
+            "width": int(cols["widths"][i]),
+            "height": int(cols["heights"][i]),
+            "params": cols["params"][i, :cols["num_params"][i]],
+        }
 
     return cameras
 
 
+def read_points3D_binary(path, tracks=False):
+    """
+    Buffer-based COLMAP points3D.bin reader.
+    Returns dict of columns:
+        point3D_ids (N,), xyz (N,3), rgb (N,3) uint8, errors (N,),
+        track_lengths (N,)
+    and with tracks=True the tracks in CSR form:
+        track_offsets (N+1,), track_image_ids (M,), track_point2D_idxs (M,)
+    """
+    buf = _read_file(path)
+    num_points = _U64.unpack_from(buf, 0)[0]
+
+    # Where record i+1 starts depends on record i's track length, so the
+    # boundaries take one sequential scan. It reads only the track length
+    # field and appends plain ints; the heads, lengths and tracks are then
+    # decoded in bulk and the track offsets are a cumsum of the lengths.
+    head_size = POINT3D_HEAD_DTYPE.itemsize
+    track_len_at = head_size - 8
+    unpack_u64 = _U64.unpack_from
+    starts = []
+    append = starts.append
+    off = 8
+    try:
+        for _ in range(num_points):
+            append(off)
+            off += head_size + (unpack_u64(buf, off + track_len_at)[0] << 3)
+    except struct.error:
+        off = len(buf) + 1
+    if off > len(buf):
+        raise ValueError(f"Truncated points3D.bin: {path}")
+    heads = np.array(starts, dtype=np.int64)
+
+    rec = _gather_records(buf, heads, POINT3D_HEAD_DTYPE)
+    lengths = rec["track_length"].astype(np.int64)
+    # int64 like read_points3D_text (and like point3D ids in images.bin).
+    cols = {
+        "point3D_ids": rec["point3D_id"].astype(np.int64),
+        "xyz": rec["xyz"].copy(),
+        "rgb": rec["rgb"].copy(),
+        "errors": rec["error"].copy(),
+        "track_lengths": lengths,
+    }
+
+    if tracks:
+        elems = _gather_ranges(buf, heads + head_size, lengths, TRACK_ELEM_DTYPE)
+        cols["track_offsets"] = np.concatenate([[0], np.cumsum(lengths)])
+        cols["track_image_ids"] = elems["image_id"].copy()
+        cols["track_point2D_idxs"] = elems["point2D_idx"].copy()
+
+    return cols
+
+
+def qvec2rotmat(qvec):
+    """COLMAP quaternion [w, x, y, z] -> rotation matrix (world-to-camera)."""
+    qw, qx, qy, qz = qvec
+    return np.array([
+        [1 - 2*qy*qy - 2*qz*qz, 2*qx*qy - 2*qz*qw,     2*qx*qz + 2*qy*qw],
+        [2*qx*qy + 2*qz*qw,     1 - 2*qx*qx - 2*qz*qz, 2*qy*qz - 2*qx*qw],
+        [2*qx*qz - 2*qy*qw,     2*qy*qz + 2*qx*qw,     1 - 2*qx*qx - 2*qy*qy],
+    ], dtype=float)
+
 
 def build_K(model_id, params):
-    if model_id == 2:  # PINHOLE
-        fx, fy, cx, cy = params
-    elif model_id in [1, 3]:  # SIMPLE_PINHOLE / SIMPLE_RADIAL
+    if model_id == 1:  # PINHOLE
+        fx, fy, cx, cy = params[:4]
+    elif model_id in [0, 2, 3]:  # SIMPLE_PINHOLE / SIMPLE_RADIAL / RADIAL
         f, cx, cy = params[:3]
         fx = fy = f
     else:
@@ -108,7 +306,7 @@ def cameras_from_colmap_bin(sparse_dir):
       plus images dict
     """
     cams_bin = read_cameras_binary(os.path.join(sparse_dir, "cameras.bin"))
-    
+
     # ✅ FIXED LINE — use the custom reader
     imgs_bin = read_images_custom_bin(os.path.join(sparse_dir, "images.bin"))
 
@@ -117,4 +315,4 @@ def cameras_from_colmap_bin(sparse_dir):
         K = build_K(cam["model_id"], cam["params"])
         cam["K"] = K
 
-    return cams_bin, imgs_bin
\ No newline at end of file
+    return cams_bin, imgs_bin
@@ -1,5 +1,6 @@
-import numpy as np
+import os
 import struct
+import numpy as np
 
 
 GAUSSIAN_DTYPE = np.dtype([
@@ -19,35 +20,221 @@ GAUSSIAN_DTYPE = np.dtype([
 ])
 
 
-def load_ply_gaussians(path):
-    """Load your Gaussian PLY into a structured NumPy array."""
+# Float offset and width of every field inside one GAUSSIAN_DTYPE record
+# (all fields are float32, so a record is 17 consecutive floats), plus the
+# "xyz" pseudo-field for the position block.
+_RECORD_FLOATS = GAUSSIAN_DTYPE.itemsize // 4
+_FIELD_SLICES = {"xyz": (0, 3)}
+_FIELD_SLICES.update(
+    (name, (offset // 4, field_dtype.itemsize // 4))
+    for name, (field_dtype, offset) in GAUSSIAN_DTYPE.fields.items()
+)
+
+# Records per gather when writing an index selection.
+_WRITE_BLOCK = 1 << 16
+
+
+def read_ply_header(f):
+    """
+    Parse the ASCII header of a Gaussian PLY.
+    Leaves f positioned at the first vertex record.
+    Returns (header_lines, vertex_count, data_offset).
+    Raises ValueError when the header is cut off or has no vertex count.
+    """
+    name = getattr(f, "name", "PLY")
+    header = []
+    while True:
+        raw = f.readline()
+        if not raw:
+            raise ValueError(f"Truncated PLY header (no end_header): {name}")
+        line = raw.decode("ascii").strip()
+        header.append(line)
+        if line == "end_header":
+            break
+
+    # find vertex count
+    element_lines = [l for l in header if l.startswith("element vertex")]
+    if not element_lines:
+        raise ValueError(f"PLY header has no 'element vertex' line: {name}")
+    N = int(element_lines[0].split()[-1])
+
+    return header, N, f.tell()
+
+
+def load_ply_gaussians(path, mmap_mode=None):
+    """
+    Load your Gaussian PLY into a structured NumPy array.
+
+    Compressed PLYs (save_compressed_ply) are decoded transparently.
+
+    mmap_mode follows np.load:
+      None -> read into a private, writable array (one allocation)
+      "r"  -> read-only memory map of the vertex block (zero-copy)
+      "c"  -> copy-on-write memory map; writes stay in memory only
+    """
     with open(path, "rb") as f:
-        header = []
-        while True:
-            line = f.readline().decode("ascii").strip()
-            header.append(line)
-            if line == "end_header":
-                break
+        header, N, offset = read_ply_header(f)
+        if is_compressed_header(header):
+            return load_compressed_ply(path)  # decoded, so never mapped
 
-        # find vertex count
-        element_line = [l for l in header if l.startswith("element vertex")][0]
-        N = int(element_line.split()[-1])
+        if mmap_mode is None:
+            # Read straight into the destination buffer instead of
+            # bytes -> frombuffer -> copy.
+            arr = np.empty(N, dtype=GAUSSIAN_DTYPE)
+            n_read = f.readinto(arr.view(np.uint8))
+            if n_read != arr.nbytes:
+                raise ValueError(f"Truncated PLY: {path}")
+            return arr
 
-        # Read all vertex binary data
-        data = f.read(N * GAUSSIAN_DTYPE.itemsize)
-        arr = np.frombuffer(data, dtype=GAUSSIAN_DTYPE)
+    if mmap_mode not in ("r", "c"):
+        raise ValueError(f"Unsupported mmap_mode: {mmap_mode!r}")
+    if N == 0:
+        # np.memmap refuses zero-length maps
+        return np.empty(0, dtype=GAUSSIAN_DTYPE)
+    if os.path.getsize(path) < offset + N * GAUSSIAN_DTYPE.itemsize:
+        raise ValueError(f"Truncated PLY: {path}")
+    return np.memmap(path, dtype=GAUSSIAN_DTYPE, mode=mmap_mode,
+                     offset=offset, shape=(N,))
 
-    return arr.copy()  # return a writable copy
 
+def _record_floats(records):
+    """(N, 17) float32 view of contiguous GAUSSIAN_DTYPE records."""
+    records = np.ascontiguousarray(records)
+    return records.view(np.float32).reshape(records.shape[0], _RECORD_FLOATS)
 
-def save_ply_gaussians(path, arr):
-    """Write structured Gaussian array back to PLY."""
-    N = arr.shape[0]
 
-    header = (
+def _gather_field(records, index, name):
+    """Contiguous copy of one field (or "xyz") of records[index]."""
+    start, width = _FIELD_SLICES[name]
+    flat = _record_floats(records)
+    if index is None:
+        col = np.take(flat, np.arange(start, start + width), axis=1)
+    else:
+        # Fancy rows + a column slice copies only width floats per record.
+        col = flat[index, start:start + width]
+    return col[:, 0] if width == 1 else col
+
+
+class GaussianCloud:
+    """
+    Struct-of-arrays view of Gaussian splats.
+
+    Columns are materialized one at a time on first access, as contiguous
+    float32 arrays: cloud.positions is the (N,3) block classification
+    needs, cloud["opacity"] is (N,), cloud["rot"] is (N,4), and so on.
+    records (GAUSSIAN_DTYPE, possibly a memmap) is only read, never copied
+    as a whole. select() just composes an index into it, so records are
+    gathered once, block by block, when the selection is written.
+    Assigned columns override the records' values.
+    """
+
+    def __init__(self, records=None, index=None, count=None):
+        self._records = records
+        self._index = index
+        self._columns = {}  # assigned, authoritative
+        self._cache = {}    # derived from records
+        if count is None:
+            count = len(index) if index is not None else records.shape[0]
+        self._count = count
+
+    @classmethod
+    def from_columns(cls, positions, **columns):
+        """A cloud with no backing records; unset attributes are written as 0."""
+        cloud = cls(count=len(positions))
+        cloud["xyz"] = positions
+        for name, values in columns.items():
+            cloud[name] = values
+        return cloud
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        return cls(load_ply_gaussians(path, mmap_mode))
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def positions(self):
+        return self["xyz"]
+
+    def __getitem__(self, name):
+        col = self._columns.get(name)
+        if col is None:
+            col = self._cache.get(name)
+        if col is None:
+            if name not in _FIELD_SLICES:
+                raise KeyError(name)
+            if self._columns or self._records is None:
+                # Overlapping assignments (e.g. "xyz" vs "x") are resolved
+                # by building the records once.
+                col = _gather_field(self.to_records(), None, name)
+            else:
+                col = _gather_field(self._records, self._index, name)
+            self._cache[name] = col
+        return col
+
+    def __setitem__(self, name, values):
+        if name not in _FIELD_SLICES:
+            raise KeyError(name)
+        width = _FIELD_SLICES[name][1]
+        shape = (self._count,) if width == 1 else (self._count, width)
+        self._columns[name] = np.ascontiguousarray(values, dtype=np.float32).reshape(shape)
+        self._cache.clear()
+
+    def select(self, selection):
+        """Sub-cloud for a boolean mask or index array; copies no records."""
+        selection = np.asarray(selection)
+        idx = np.flatnonzero(selection) if selection.dtype == bool else selection.astype(np.int64)
+
+        if self._records is not None:
+            index = idx if self._index is None else self._index[idx]
+            sub = GaussianCloud(self._records, index)
+        else:
+            sub = GaussianCloud(count=idx.size)
+        for name, col in self._columns.items():
+            sub._columns[name] = col[idx]
+        return sub
+
+    def _record_block(self, start, stop):
+        if self._records is None:
+            block = np.zeros(stop - start, dtype=GAUSSIAN_DTYPE)
+        elif self._index is None:
+            block = self._records[start:stop]
+        else:
+            block = self._records[self._index[start:stop]]
+
+        if self._columns:
+            block = np.array(block, dtype=GAUSSIAN_DTYPE)  # writable, not the memmap
+            flat = _record_floats(block)
+            for name, col in self._columns.items():
+                field_start, width = _FIELD_SLICES[name]
+                flat[:, field_start:field_start + width] = col[start:stop].reshape(-1, width)
+        return block
+
+    def to_records(self):
+        """The cloud as one GAUSSIAN_DTYPE array."""
+        return np.asarray(self._record_block(0, self._count))
+
+    def write_to(self, f):
+        """Write the records to an open binary file, one bounded block at a time."""
+        for start in range(0, self._count, _WRITE_BLOCK):
+            block = self._record_block(start, min(start + _WRITE_BLOCK, self._count))
+            f.write(np.ascontiguousarray(block, dtype=GAUSSIAN_DTYPE).data)
+
+
+def as_gaussian_cloud(gaussians):
+    """Wrap a GAUSSIAN_DTYPE array (a GaussianCloud is returned as-is)."""
+    if isinstance(gaussians, GaussianCloud):
+        return gaussians
+    return GaussianCloud(gaussians)
+
+
+def ply_header(count):
+    """ASCII header for GAUSSIAN_DTYPE records; count may be an int or str."""
+    return (
         "ply\n"
         "format binary_little_endian 1.0\n"
-        f"element vertex {N}\n"
+        f"element vertex {count}\n"
         "property float x\n"
         "property float y\n"
         "property float z\n"
@@ -68,6 +255,546 @@ def save_ply_gaussians(path, arr):
         "end_header\n"
     )
 
+
+def save_ply_gaussians(path, arr):
+    """Write structured Gaussian array (or a GaussianCloud) back to PLY."""
+    N = len(arr)
+
+    with open(path, "wb") as f:
+        f.write(ply_header(N).encode("ascii"))
+        if isinstance(arr, GaussianCloud):
+            arr.write_to(f)
+        else:
+            f.write(arr.astype(GAUSSIAN_DTYPE).tobytes())
+
+
+def iter_ply_chunks(path, chunk_size):
+    """
+    Yield the vertex block of a Gaussian PLY as consecutive structured
+    arrays of at most chunk_size records, so memory stays O(chunk_size).
+    """
+    with open(path, "rb") as f:
+        header, N, _ = read_ply_header(f)
+        if is_compressed_header(header):
+            raise ValueError(f"Compressed PLY cannot be read in chunks: {path}")
+        for start in range(0, N, chunk_size):
+            chunk = np.empty(min(chunk_size, N - start), dtype=GAUSSIAN_DTYPE)
+            if f.readinto(chunk.view(np.uint8)) != chunk.nbytes:
+                raise ValueError(f"Truncated PLY: {path}")
+            yield chunk
+
+
+# Zero-padded so the final count can be patched in place without
+# shifting the payload.
+_STREAM_COUNT_DIGITS = 12
+
+
+class PlyStreamWriter:
+    """
+    Write a Gaussian PLY incrementally when the vertex count is not known
+    up front. The header is written with a fixed-width placeholder count
+    that close() overwrites.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+
+        header = ply_header("0" * _STREAM_COUNT_DIGITS)
+        self._count_pos = header.index("element vertex ") + len("element vertex ")
+        self._f = open(path, "wb")
+        self._f.write(header.encode("ascii"))
+
+    def write(self, arr):
+        if isinstance(arr, GaussianCloud):
+            arr.write_to(self._f)
+            self.count += len(arr)
+            return
+        if arr.dtype != GAUSSIAN_DTYPE:
+            arr = arr.astype(GAUSSIAN_DTYPE)
+        self._f.write(np.ascontiguousarray(arr).data)
+        self.count += arr.shape[0]
+
+    def close(self):
+        if self._f.closed:
+            return
+        self._f.seek(self._count_pos)
+        self._f.write(f"{self.count:0{_STREAM_COUNT_DIGITS}d}".encode("ascii"))
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ply_vertex_count(path):
+    with open(path, "rb") as f:
+        return read_ply_header(f)[1]
+
+
+_COPY_BLOCK = 1 << 24
+
+
+def _copy_range(src_fd, dst_fd, src_offset, dst_offset, count):
+    """
+    Copy count bytes between files without passing them through user
+    space: copy_file_range, then sendfile, then a plain read/write loop.
+    """
+    done = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while done < count:
+                n = os.copy_file_range(src_fd, dst_fd, count - done,
+                                       src_offset + done, dst_offset + done)
+                if n == 0:
+                    break
+                done += n
+        except OSError:
+            pass  # e.g. EXDEV/ENOSYS on older kernels; fall through
+
+    if done < count and hasattr(os, "sendfile"):
+        try:
+            os.lseek(dst_fd, dst_offset + done, os.SEEK_SET)
+            while done < count:
+                n = os.sendfile(dst_fd, src_fd, src_offset + done, count - done)
+                if n == 0:
+                    break
+                done += n
+        except OSError:
+            pass
+
+    while done < count:
+        block = os.pread(src_fd, min(count - done, _COPY_BLOCK), src_offset + done)
+        if not block:
+            raise ValueError("Source PLY is shorter than its header claims")
+        os.pwrite(dst_fd, block, dst_offset + done)
+        done += len(block)
+
+
+def concat_ply_files(path, src_paths, tail=None):
+    """
+    Write the records of several Gaussian PLYs, in order, into one PLY,
+    optionally followed by the in-memory records tail (an array or a
+    GaussianCloud).
+    Source payloads are copied kernel-side, so the CPU/memory cost is
+    O(len(tail)) regardless of how large the sources are.
+    Returns the total vertex count.
+    """
+    sources = []
+    for src in src_paths:
+        with open(src, "rb") as f:
+            header, N, offset = read_ply_header(f)
+        if is_compressed_header(header):
+            raise ValueError(f"Compressed PLY payloads cannot be concatenated: {src}")
+        sources.append((src, offset, N * GAUSSIAN_DTYPE.itemsize))
+
+    tail_count = 0 if tail is None else len(tail)
+    total = sum(n_bytes for _, _, n_bytes in sources) // GAUSSIAN_DTYPE.itemsize + tail_count
+
+    with open(path, "wb") as f:
+        f.write(ply_header(total).encode("ascii"))
+        f.flush()
+        pos = f.tell()
+
+        for src, offset, n_bytes in sources:
+            with open(src, "rb") as sf:
+                _copy_range(sf.fileno(), f.fileno(), offset, pos, n_bytes)
+            pos += n_bytes
+
+        f.seek(pos)
+        if tail_count:
+            if isinstance(tail, GaussianCloud):
+                tail.write_to(f)
+            else:
+                f.write(np.ascontiguousarray(tail, dtype=GAUSSIAN_DTYPE).data)
+
+    return total
+
+
+# --------- Compressed PLY (SuperSplat layout) ---------
+#
+# element chunk: per 256 consecutive splats, 18 floats
+#   min/max x,y,z | min/max scale_0..2 | min/max r,g,b
+# element vertex: 4 uint32 per splat
+#   packed_position  11/10/11-bit x,y,z relative to the chunk bounds
+#   packed_rotation  2-bit index of the largest component + 3 x 10 bits
+#   packed_scale     11/10/11-bit log-scales relative to the chunk bounds
+#   packed_color     8-bit r,g,b (chunk-relative) and alpha
+# 16.3 bytes per splat instead of 68. Normals are not stored.
+
+COMPRESSED_CHUNK = 256
+
+SH_C0 = 0.28209479177387814
+
+_CHUNK_PROPS = [
+    "min_x", "min_y", "min_z", "max_x", "max_y", "max_z",
+    "min_scale_x", "min_scale_y", "min_scale_z", "max_scale_x", "max_scale_y", "max_scale_z",
+    "min_r", "min_g", "min_b", "max_r", "max_g", "max_b",
+]
+_PACKED_PROPS = ["packed_position", "packed_rotation", "packed_scale", "packed_color"]
+
+
+def compressed_ply_header(num_splats):
+    num_chunks = -(-num_splats // COMPRESSED_CHUNK)
+    lines = ["ply", "format binary_little_endian 1.0", f"element chunk {num_chunks}"]
+    lines += [f"property float {p}" for p in _CHUNK_PROPS]
+    lines.append(f"element vertex {num_splats}")
+    lines += [f"property uint {p}" for p in _PACKED_PROPS]
+    lines.append("end_header")
+    return "\n".join(lines) + "\n"
+
+
+def is_compressed_header(header):
+    return any(line.startswith("element chunk") for line in header)
+
+
+def morton_order(xyz):
+    """Permutation sorting xyz (N,3) along a 30-bit Morton curve."""
+    if len(xyz) == 0:
+        return np.zeros(0, dtype=np.int64)
+    lo = xyz.min(axis=0)
+    extent = np.maximum(xyz.max(axis=0) - lo, 1e-12)
+    q = np.minimum(((xyz - lo) / extent * 1024).astype(np.uint64), 1023)
+
+    code = np.zeros(len(xyz), dtype=np.uint64)
+    for bit in range(10):
+        for axis in range(3):
+            code |= ((q[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(3 * bit + 2 - axis)
+    return np.argsort(code, kind="stable")
+
+
+def _pack_unorm(v, bits):
+    t = (1 << bits) - 1
+    return np.clip(np.floor(v * t + 0.5), 0, t).astype(np.uint32)
+
+
+def _unpack_unorm(v, bits):
+    t = (1 << bits) - 1
+    return (v & t).astype(np.float32) / t
+
+
+def _chunk_bounds(values, num_chunks):
+    """Per-chunk (min, max) of values (N,k); the last chunk may be partial."""
+    starts = np.arange(num_chunks) * COMPRESSED_CHUNK
+    return np.minimum.reduceat(values, starts, axis=0), np.maximum.reduceat(values, starts, axis=0)
+
+
+def _normalize_in_chunk(values, lo, hi):
+    chunk = np.arange(len(values)) // COMPRESSED_CHUNK
+    lo, hi = lo[chunk], hi[chunk]
+    extent = hi - lo
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(extent > 0, (values - lo) / extent, 0.0)
+
+
+def _pack_111011(v):
+    return (_pack_unorm(v[:, 0], 11) << 21) | (_pack_unorm(v[:, 1], 10) << 11) | _pack_unorm(v[:, 2], 11)
+
+
+def _unpack_111011(p):
+    return np.stack([_unpack_unorm(p >> 21, 11), _unpack_unorm(p >> 11, 10), _unpack_unorm(p, 11)], axis=-1)
+
+
+class CompressedSplats:
+    """
+    Gaussians in the compressed PLY layout: chunks (C,18) float32 and
+    packed (N,4) uint32. Splats keep the order they were encoded in.
+    """
+
+    def __init__(self, chunks, packed):
+        self.chunks = chunks
+        self.packed = packed
+
+    def __len__(self):
+        return self.packed.shape[0]
+
+    @classmethod
+    def encode(cls, gaussians):
+        """Quantize a GAUSSIAN_DTYPE array or GaussianCloud, in its current order."""
+        cloud = as_gaussian_cloud(gaussians)
+        N = len(cloud)
+        num_chunks = -(-N // COMPRESSED_CHUNK)
+        chunks = np.empty((num_chunks, 18), dtype=np.float32)
+        packed = np.empty((N, 4), dtype=np.uint32)
+        if N == 0:
+            return cls(chunks, packed)
+
+        xyz = cloud.positions
+        scale = cloud["scale"]
+        color = cloud["f_dc"] * SH_C0 + 0.5
+
+        for k, values in enumerate((xyz, scale, color)):
+            lo, hi = _chunk_bounds(values, num_chunks)
+            chunks[:, 6 * k:6 * k + 3] = lo
+            chunks[:, 6 * k + 3:6 * k + 6] = hi
+            normalized = _normalize_in_chunk(values, lo, hi)
+            if k == 0:
+                packed[:, 0] = _pack_111011(normalized)
+            elif k == 1:
+                packed[:, 2] = _pack_111011(normalized)
+            else:
+                alpha = 1.0 / (1.0 + np.exp(-cloud["opacity"].astype(np.float64)))
+                rgba = np.column_stack([normalized, alpha])
+                packed[:, 3] = ((_pack_unorm(rgba[:, 0], 8) << 24) | (_pack_unorm(rgba[:, 1], 8) << 16) |
+                                (_pack_unorm(rgba[:, 2], 8) << 8) | _pack_unorm(rgba[:, 3], 8))
+
+        # Smallest three: drop the largest |component| (made positive, so
+        # it can be rebuilt as sqrt(1 - sum of the others squared)); the
+        # rest lie in [-1/sqrt(2), 1/sqrt(2)]. Stored in x,y,z,w order.
+        rot = cloud["rot"].astype(np.float64)
+        q = rot[:, [1, 2, 3, 0]]
+        q /= np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+        largest = np.argmax(np.abs(q), axis=1)
+        q *= np.where(q[np.arange(N), largest] < 0, -1.0, 1.0)[:, None]
+        rest = q[np.arange(4)[None, :] != largest[:, None]].reshape(N, 3)
+        rest = rest * (np.sqrt(2) * 0.5) + 0.5
+        packed[:, 1] = ((largest.astype(np.uint32) << 30) | (_pack_unorm(rest[:, 0], 10) << 20) |
+                        (_pack_unorm(rest[:, 1], 10) << 10) | _pack_unorm(rest[:, 2], 10))
+
+        return cls(chunks, packed)
+
+    def decode(self):
+        """Back to GAUSSIAN_DTYPE (up to quantization; normals are zero)."""
+        N = len(self)
+        out = np.zeros(N, dtype=GAUSSIAN_DTYPE)
+        if N == 0:
+            return out
+
+        chunk = np.arange(N) // COMPRESSED_CHUNK
+        c = self.chunks[chunk]
+
+        xyz = c[:, 0:3] + _unpack_111011(self.packed[:, 0]) * (c[:, 3:6] - c[:, 0:3])
+        out["x"], out["y"], out["z"] = xyz.T
+        out["scale"] = c[:, 6:9] + _unpack_111011(self.packed[:, 2]) * (c[:, 9:12] - c[:, 6:9])
+
+        col = self.packed[:, 3]
+        rgb = np.stack([_unpack_unorm(col >> 24, 8), _unpack_unorm(col >> 16, 8),
+                        _unpack_unorm(col >> 8, 8)], axis=-1)
+        out["f_dc"] = (c[:, 12:15] + rgb * (c[:, 15:18] - c[:, 12:15]) - 0.5) / SH_C0
+        alpha = np.clip(_unpack_unorm(col, 8).astype(np.float64), 1e-6, 1 - 1e-6)
+        out["opacity"] = -np.log(1.0 / alpha - 1.0)
+
+        r = self.packed[:, 1]
+        rest = np.stack([_unpack_unorm(r >> 20, 10), _unpack_unorm(r >> 10, 10),
+                         _unpack_unorm(r, 10)], axis=-1)
+        rest = (rest - 0.5) / (np.sqrt(2) * 0.5)
+        largest = (r >> 30).astype(np.int64)
+        q = np.empty((N, 4))
+        q[np.arange(N), largest] = np.sqrt(np.maximum(0.0, 1.0 - (rest ** 2).sum(axis=1)))
+        q[np.arange(4)[None, :] != largest[:, None]] = rest.reshape(-1)
+        out["rot"] = q[:, [3, 0, 1, 2]]
+        return out
+
+    @classmethod
+    def concat(cls, parts):
+        """Join encoded parts; all but the last must fill whole chunks."""
+        for part in parts[:-1]:
+            if len(part) % COMPRESSED_CHUNK:
+                raise ValueError("Only the last part of a compressed concat may end mid-chunk")
+        return cls(np.concatenate([p.chunks for p in parts]), np.concatenate([p.packed for p in parts]))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(compressed_ply_header(len(self)).encode("ascii"))
+            f.write(np.ascontiguousarray(self.chunks, dtype="<f4").data)
+            f.write(np.ascontiguousarray(self.packed, dtype="<u4").data)
+
+
+def compressed_prefix(gaussians):
+    """
+    Morton-sort gaussians and encode every whole chunk, so the result can
+    start many compressed files (e.g. Static_Master in every Final) without
+    re-encoding. Returns (encoded, leftover): leftover holds the < 256
+    sorted records that did not fill a chunk; save_compressed_ply encodes
+    them together with each file's own records.
+    """
+    cloud = as_gaussian_cloud(gaussians)
+    ordered = cloud.select(morton_order(cloud.positions)).to_records()
+    full = len(ordered) - len(ordered) % COMPRESSED_CHUNK
+    return CompressedSplats.encode(ordered[:full]), ordered[full:]
+
+
+def save_compressed_ply(path, gaussians, prefix=None):
+    """
+    Write gaussians as a compressed PLY, Morton-sorted so each chunk's
+    quantization range stays tight (record order is not preserved).
+    prefix: optional compressed_prefix() result written first.
+    Returns the number of splats written.
+    """
+    records = as_gaussian_cloud(gaussians).to_records()
+    if prefix is not None:
+        head, leftover = prefix
+        records = np.concatenate([leftover, records])
+
+    cloud = GaussianCloud(records)
+    tail = CompressedSplats.encode(cloud.select(morton_order(cloud.positions)))
+    encoded = tail if prefix is None else CompressedSplats.concat([head, tail])
+    encoded.save(path)
+    return len(encoded)
+
+
+def load_compressed_ply(path):
+    """Decode a compressed PLY into a GAUSSIAN_DTYPE array."""
+    with open(path, "rb") as f:
+        header, N, _ = read_ply_header(f)
+        chunk_line = [l for l in header if l.startswith("element chunk")][0]
+        num_chunks = int(chunk_line.split()[-1])
+        chunk_props = sum(1 for l in header if l.startswith("property float"))
+        if chunk_props != len(_CHUNK_PROPS):
+            raise ValueError(f"Unknown compressed PLY chunk layout ({chunk_props} properties, "
+                             f"expected {len(_CHUNK_PROPS)}): {path}")
+
+        chunks = np.fromfile(f, dtype="<f4", count=num_chunks * chunk_props)
+        packed = np.fromfile(f, dtype="<u4", count=N * 4)
+    if chunks.size != num_chunks * chunk_props or packed.size != N * 4:
+        raise ValueError(f"Truncated PLY: {path}")
+    chunks = chunks.reshape(num_chunks, chunk_props)
+    packed = packed.reshape(N, 4)
+
+    return CompressedSplats(chunks.astype(np.float32), packed).decode()
+
+
+# --------- Gaussian sequence (static once + per-frame dynamic) ---------
+#
+# ASCII header, then raw GAUSSIAN_DTYPE blocks:
+#   gaussian_sequence
+#   format binary_little_endian 1.0
+#   record_size 68
+#   static <offset> <count>
+#   frame <index> <offset> <count>     one line per frame
+#   end_header
+# Offsets are absolute byte positions, so any frame is located from the
+# header alone. The header is padded to a multiple of 4 bytes, which keeps
+# every float of the memory-mapped blocks aligned.
+
+SEQUENCE_MAGIC = "gaussian_sequence"
+
+_SEQUENCE_DIGITS = 12
+
+
+def _sequence_header(static_count, frame_counts, data_offset):
+    size = GAUSSIAN_DTYPE.itemsize
+    lines = [SEQUENCE_MAGIC, "format binary_little_endian 1.0", f"record_size {size}"]
+    pos = data_offset
+    lines.append(f"static {pos:0{_SEQUENCE_DIGITS}d} {static_count:0{_SEQUENCE_DIGITS}d}")
+    pos += static_count * size
+    for i, count in frame_counts:
+        lines.append(f"frame {i} {pos:0{_SEQUENCE_DIGITS}d} {count:0{_SEQUENCE_DIGITS}d}")
+        pos += count * size
+    text = "\n".join(lines) + "\nend_header"
+    return text + " " * (-(len(text) + 1) % 4) + "\n"
+
+
+def sequence_header(static_count, frame_counts):
+    """Header for a static block and frame_counts [(frame index, count)]."""
+    # Offsets are fixed-width, so the header length does not depend on them.
+    length = len(_sequence_header(static_count, frame_counts, 0))
+    return _sequence_header(static_count, frame_counts, length)
+
+
+def read_sequence_header(f):
+    """
+    Parse a sequence header. Leaves f at the first record.
+    Returns ((static_offset, static_count), {frame index: (offset, count)}),
+    the frames in file order.
+    """
+    if f.readline().decode("ascii").strip() != SEQUENCE_MAGIC:
+        raise ValueError("Not a Gaussian sequence file")
+    static = None
+    frames = {}
+    while True:
+        toks = f.readline().decode("ascii").split()
+        if not toks:
+            raise ValueError("Truncated sequence header")
+        if toks[0] == "end_header":
+            break
+        if toks[0] == "record_size" and int(toks[1]) != GAUSSIAN_DTYPE.itemsize:
+            raise ValueError(f"Unsupported record size {toks[1]}")
+        if toks[0] == "static":
+            static = (int(toks[1]), int(toks[2]))
+        elif toks[0] == "frame":
+            frames[int(toks[1])] = (int(toks[2]), int(toks[3]))
+    return static, frames
+
+
+def _sequence_source(src):
+    """(ply path, payload offset, count) for an uncompressed PLY, else (None, cloud, count)."""
+    if isinstance(src, (str, os.PathLike)):
+        with open(src, "rb") as f:
+            header, N, offset = read_ply_header(f)
+        if not is_compressed_header(header):
+            return src, offset, N
+        src = load_compressed_ply(src)
+    cloud = as_gaussian_cloud(src)
+    return None, cloud, len(cloud)
+
+
+def save_gaussian_sequence(path, static, frames):
+    """
+    Write a sequence file holding the static splats once, then each frame's
+    dynamic splats. static: PLY path, GAUSSIAN_DTYPE array or GaussianCloud;
+    frames: [(frame index, the same)]. Uncompressed PLY payloads are copied
+    kernel-side; compressed PLYs are decoded first.
+    """
+    blocks = [_sequence_source(static)] + [_sequence_source(src) for _, src in frames]
+    header = sequence_header(blocks[0][2], [(i, block[2]) for (i, _), block in zip(frames, blocks[1:])])
+
     with open(path, "wb") as f:
         f.write(header.encode("ascii"))
-        f.write(arr.astype(GAUSSIAN_DTYPE).tobytes())
\ No newline at end of file
+        f.flush()
+        pos = f.tell()
+
+        for src, data, count in blocks:
+            n_bytes = count * GAUSSIAN_DTYPE.itemsize
+            if src is not None:
+                with open(src, "rb") as sf:
+                    _copy_range(sf.fileno(), f.fileno(), data, pos, n_bytes)
+            else:
+                f.seek(pos)
+                data.write_to(f)
+                f.flush()
+            pos += n_bytes
+
+
+class GaussianSequence:
+    """
+    Read side of save_gaussian_sequence. The file is memory-mapped once and
+    frame(i) looks its block up in the header table, so opening any frame
+    is O(1) and copies no records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._static, self._frames = read_sequence_header(f)
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        self._static_cloud = None
+
+    @property
+    def frames(self):
+        """Frame indices, in file order."""
+        return list(self._frames)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def _block(self, offset, count):
+        n_bytes = count * GAUSSIAN_DTYPE.itemsize
+        if offset + n_bytes > self._map.shape[0]:
+            raise ValueError(f"Truncated sequence: {self.path}")
+        return GaussianCloud(self._map[offset:offset + n_bytes].view(GAUSSIAN_DTYPE))
+
+    @property
+    def static(self):
+        if self._static_cloud is None:
+            self._static_cloud = self._block(*self._static)
+        return self._static_cloud
+
+    def dynamic(self, i):
+        return self._block(*self._frames[i])
+
+    def frame(self, i):
+        """(static, dynamic) GaussianClouds over the mapped file for frame i."""
+        return self.static, self.dynamic(i)
@@ -0,0 +1,149 @@
+import os
+import json
+import struct
+import argparse
+from collections import OrderedDict
+
+import numpy as np
+import imageio.v2 as imageio
+
+from pipeline_utils import DATA_ROOT, MASKS_DIR, load_cameras
+
+MASK_ARCHIVE_PATH = os.path.join(DATA_ROOT, "masks_packed.bin")
+
+# File layout:
+#   magic (8 bytes) | index offset (uint64) | packed masks ... | JSON index
+# Every mask is np.packbits(mask > 0), i.e. 8 pixels per byte.
+ARCHIVE_MAGIC = b"PLYMASK1"
+_PREAMBLE = struct.Struct("<8sQ")
+
+
+def _frames_in_folder(folder_path):
+    frames = []
+    for name in os.listdir(folder_path):
+        stem, ext = os.path.splitext(name)
+        if ext == ".png" and stem.isdigit():
+            frames.append(int(stem))
+    return sorted(frames)
+
+
+def build_mask_archive(cams, masks_dir=MASKS_DIR, out_path=MASK_ARCHIVE_PATH, frames=None):
+    """
+    One-time ingest of masks/<cam>/<frame>.png into a packed-bit archive.
+    frames: iterable of frame indices, or None to take every PNG found.
+    Returns the number of masks written.
+    """
+    index = {}
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(ARCHIVE_MAGIC, 0))
+
+        for cam in cams:
+            folder_path = os.path.join(masks_dir, cam.mask_folder)
+            cam_frames = _frames_in_folder(folder_path) if frames is None else frames
+
+            for frame_idx in cam_frames:
+                mask_path = os.path.join(folder_path, f"{frame_idx:06d}.png")
+                if not os.path.isfile(mask_path):
+                    raise FileNotFoundError(f"Mask missing: {mask_path}")
+                m = imageio.imread(mask_path)
+                if m.ndim == 3:
+                    m = m[..., 0]  # convert to grayscale
+
+                packed = np.packbits(m > 0)
+                index[f"{cam.mask_folder}/{frame_idx}"] = [f.tell(), m.shape[0], m.shape[1]]
+                f.write(packed.tobytes())
+
+        index_offset = f.tell()
+        f.write(json.dumps(index).encode("utf-8"))
+        f.seek(0)
+        f.write(_PREAMBLE.pack(ARCHIVE_MAGIC, index_offset))
+
+    os.replace(tmp_path, out_path)
+    return len(index)
+
+
+class MaskStore:
+    """
+    Read-only view of a packed mask archive with a bounded LRU cache of
+    decoded masks. Decoded masks are uint8 0/1 arrays of shape (H, W).
+    """
+
+    def __init__(self, path=MASK_ARCHIVE_PATH, cache_size=128):
+        with open(path, "rb") as f:
+            magic, index_offset = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError(f"Not a mask archive: {path}")
+            f.seek(index_offset)
+            self.index = json.loads(f.read().decode("utf-8"))
+
+        self.path = path
+        self.cache_size = cache_size
+        self._data = np.memmap(path, dtype=np.uint8, mode="r", shape=(index_offset,))
+        self._cache = OrderedDict()
+
+    def __contains__(self, key):
+        folder, frame_idx = key
+        return f"{folder}/{frame_idx}" in self.index
+
+    def _entry(self, folder, frame_idx):
+        entry = self.index.get(f"{folder}/{frame_idx}")
+        if entry is None:
+            raise FileNotFoundError(f"Mask missing from archive: {folder}/{frame_idx:06d}")
+        return entry
+
+    def packed_bytes(self, folder, frame_idx):
+        """Raw packed bits of one mask, e.g. for content hashing."""
+        offset, H, W = self._entry(folder, frame_idx)
+        return self._data[offset:offset + (H * W + 7) // 8].tobytes()
+
+    def get(self, folder, frame_idx):
+        key = (folder, frame_idx)
+        m = self._cache.get(key)
+        if m is not None:
+            self._cache.move_to_end(key)
+            return m
+
+        offset, H, W = self._entry(folder, frame_idx)
+        n_bytes = (H * W + 7) // 8
+        bits = self._data[offset:offset + n_bytes]
+        m = np.unpackbits(bits, count=H * W).reshape(H, W)
+        m.flags.writeable = False  # shared with every cache hit
+
+        self._cache[key] = m
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return m
+
+    def stale_pngs(self, masks_dir=MASKS_DIR):
+        """
+        PNGs in the camera folders this archive covers that it does not
+        reflect: edited after the archive was built, or not in it at all.
+        """
+        built = os.stat(self.path).st_mtime_ns
+        folders = sorted({key.rsplit("/", 1)[0] for key in self.index})
+        stale = []
+        for folder in folders:
+            folder_path = os.path.join(masks_dir, folder)
+            if not os.path.isdir(folder_path):
+                continue  # PNGs removed after packing; the archive is the source
+            for frame_idx in _frames_in_folder(folder_path):
+                mask_path = os.path.join(folder_path, f"{frame_idx:06d}.png")
+                if (f"{folder}/{frame_idx}" not in self.index
+                        or os.stat(mask_path).st_mtime_ns > built):
+                    stale.append(mask_path)
+        return stale
+
+    def load_frame(self, frame_idx, cams):
+        return [self.get(cam.mask_folder, frame_idx) for cam in cams]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack per-camera PNG masks into one archive.")
+    parser.add_argument("--masks-dir", default=MASKS_DIR)
+    parser.add_argument("--out", default=MASK_ARCHIVE_PATH)
+    args = parser.parse_args()
+
+    cams = load_cameras()
+    count = build_mask_archive(cams, masks_dir=args.masks_dir, out_path=args.out)
+    print("Packed", count, "masks into:", args.out)
@@ -0,0 +1,98 @@
+import os
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Metrics:
+    """
+    Per-stage timers and counters, flushed as one JSON line per emit().
+
+    debug=True turns on diagnostics that cost real work (vote histograms,
+    per-camera hit counts, mask statistics); callers check metrics.debug
+    before computing them, so a normal run never pays for them.
+    """
+
+    def __init__(self, sink_path=None, debug=False):
+        self.sink_path = sink_path
+        self.debug = debug
+        self.timings = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.values = {}
+
+    @contextmanager
+    def timer(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] += time.perf_counter() - t0
+
+    def count(self, name, n=1):
+        self.counters[name] += int(n)
+
+    def set(self, name, value):
+        """Record a non-additive value for this record."""
+        self.values[name] = value
+
+    def add(self, name, values):
+        """Elementwise-accumulate a sequence (e.g. per-camera hits, a histogram)."""
+        values = [int(v) for v in values]
+        current = self.values.setdefault(name, [])
+        if len(current) < len(values):
+            current.extend([0] * (len(values) - len(current)))
+        for i, v in enumerate(values):
+            current[i] += v
+
+    def emit(self, **fields):
+        """
+        Append fields plus everything accumulated since the last emit to the
+        sink (if any), then reset. Returns the record.
+        """
+        record = dict(fields)
+        record["pid"] = os.getpid()
+        record["timings"] = {k: round(v, 6) for k, v in self.timings.items()}
+        record["counters"] = dict(self.counters)
+        record.update(self.values)
+
+        if self.sink_path:
+            # One short append per record, so lines from pool workers
+            # sharing the file do not interleave.
+            with open(self.sink_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+        self.timings.clear()
+        self.counters.clear()
+        self.values.clear()
+        return record
+
+
+class NullMetrics(Metrics):
+    """Metrics that records nothing; the default when no sink is wanted."""
+
+    @contextmanager
+    def timer(self, stage):
+        yield
+
+    def count(self, name, n=1):
+        pass
+
+    def set(self, name, value):
+        pass
+
+    def add(self, name, values):
+        pass
+
+    def emit(self, **fields):
+        return fields
+
+
+NULL_METRICS = NullMetrics()
+
+
+def make_metrics(sink_path=None, debug=False):
+    """Metrics writing to sink_path, or NULL_METRICS when nothing is asked for."""
+    if sink_path is None and not debug:
+        return NULL_METRICS
+    return Metrics(sink_path, debug)
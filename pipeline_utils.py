@@ -9,17 +9,18 @@ CAM_CFG_PATH = os.path.join(DATA_ROOT, "camera_config.json")
 
 
 class Camera:
-    def __init__(self, K, R, T, width, height, mask_folder):
+    def __init__(self, K, R, T, width, height, mask_folder, image_name=None):
         self.K = K
         self.R = R
         self.T = T
         self.width = width
         self.height = height
         self.mask_folder = mask_folder
+        self.image_name = image_name
 
 
-def load_cameras():
-    with open(CAM_CFG_PATH, "r") as f:
+def load_cameras(path=CAM_CFG_PATH):
+    with open(path, "r") as f:
         data = json.load(f)
 
     cams = []
@@ -30,19 +31,25 @@ def load_cameras():
         w, h = int(c["width"]), int(c["height"])
         folder = c["mask_folder"]
 
-        cams.append(Camera(K, R, T, w, h, folder))
+        cams.append(Camera(K, R, T, w, h, folder, c.get("image_name")))
     return cams
 
 
-def load_masks_for_frame(frame_idx, cams):
+def load_masks_for_frame(frame_idx, cams, store=None, masks_dir=MASKS_DIR):
     """
     frame_idx: integer frame index (0..57)
     cams: list of Camera objects
+    store: optional mask_store.MaskStore; read from its packed archive
+           instead of decoding PNGs
+    masks_dir: root of the per-camera PNG folders
     """
+    if store is not None:
+        return store.load_frame(frame_idx, cams)
+
     frame_str = f"{frame_idx:06d}.png"  # 000000.png, 000001.png, ...
     masks = []
     for cam in cams:
-        mask_path = os.path.join(MASKS_DIR, cam.mask_folder, frame_str)
+        mask_path = os.path.join(masks_dir, cam.mask_folder, frame_str)
         if not os.path.isfile(mask_path):
             raise FileNotFoundError(f"Mask missing: {mask_path}")
         m = imageio.imread(mask_path)
@@ -84,4 +91,177 @@ def project_points(K, R, T, xyz):
     v = pts_img[:, 1] / pts_img[:, 2]
     depth = pts_cam[:, 2]
 
-    return np.stack([u, v], axis=-1), depth
\ No newline at end of file
+    return np.stack([u, v], axis=-1), depth
+
+
+# Splats per block in project_pixel_indices; keeps the (C, 3, chunk)
+# temporaries cache-resident regardless of cloud size.
+PROJECTION_CHUNK = 1 << 13
+
+
+def build_projection_matrices(cams, mask_shapes=None):
+    """
+    Stack every camera into one (C,3,4) projection tensor.
+    Uses the same C2W -> W2C inversion as project_points. If mask_shapes
+    [(H, W), ...] is given, the mask-resolution scale is folded into K so
+    the result maps world points straight to mask pixels.
+    """
+    P = np.empty((len(cams), 3, 4), dtype=np.float64)
+    for c, cam in enumerate(cams):
+        R_W2C = cam.R.T
+        T_W2C = -R_W2C @ cam.T.flatten()
+
+        K = cam.K.copy()
+        if mask_shapes is not None:
+            H_mask, W_mask = mask_shapes[c]
+            K[0] *= W_mask / cam.width
+            K[1] *= H_mask / cam.height
+
+        P[c, :, :3] = K @ R_W2C
+        P[c, :, 3] = K @ T_W2C
+    return P
+
+
+def project_pixel_indices(P, xyz, sizes, chunk_size=PROJECTION_CHUNK):
+    """
+    Project xyz (N,3) into all cameras of P (C,3,4) in one vectorized pass.
+    sizes: (C,2) array of (H, W) for each camera's pixel grid.
+    Returns (C,N) int32 flat pixel indices v*W + u, with -1 where the splat
+    is behind the camera or falls outside the image.
+    """
+    C = P.shape[0]
+    N = xyz.shape[0]
+    sizes = np.asarray(sizes)
+    H = sizes[:, 0].astype(np.uint32)
+    W = sizes[:, 1].astype(np.uint32)
+
+    # One (C*3, 3) GEMM operand instead of C separate matmuls; the (C*3, n)
+    # result keeps each camera's rows contiguous along the splat axis.
+    M = np.ascontiguousarray(P[:, :, :3].reshape(C * 3, 3))
+    t = P[:, :, 3].reshape(C * 3, 1)
+    W_col = W[:, None]
+    H_col = H[:, None]
+
+    out = np.empty((C, N), dtype=np.int32)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for start in range(0, N, chunk_size):
+            stop = min(start + chunk_size, N)
+            pts = np.asarray(xyz[start:stop], dtype=P.dtype)
+
+            proj = (M @ pts.T + t).reshape(C, 3, -1)  # (C, 3, n)
+            depth = proj[:, 2]
+            inv_depth = 1.0 / depth
+            u = np.floor(proj[:, 0] * inv_depth).astype(np.int32)
+            v = np.floor(proj[:, 1] * inv_depth).astype(np.int32)
+
+            # Viewed as unsigned, negative coordinates wrap to huge values,
+            # so one compare per axis covers both image bounds.
+            valid = (
+                (depth > 0) &
+                (u.view(np.uint32) < W_col) &
+                (v.view(np.uint32) < H_col)
+            )
+            idx = out[:, start:stop]
+            np.multiply(v, W_col.astype(np.int32), out=idx)
+            idx += u
+            idx[~valid] = -1
+    return out
+
+
+def flatten_masks(masks):
+    """
+    Concatenate binarized masks into one flat uint8 buffer for gathers.
+    Returns (flat, offsets, sizes); flat[-1] is a zero sentinel that invalid
+    (-1) pixel indices can be redirected to.
+    """
+    sizes = np.array([m.shape[:2] for m in masks], dtype=np.int64)
+    offsets = np.zeros(len(masks), dtype=np.int32)
+    offsets[1:] = np.cumsum(sizes[:, 0] * sizes[:, 1])[:-1]
+
+    total = int((sizes[:, 0] * sizes[:, 1]).sum())
+    flat = np.zeros(total + 1, dtype=np.uint8)
+    for off, m in zip(offsets, masks):
+        np.greater(m, 0, out=flat[off:off + m.size].reshape(m.shape))
+    return flat, offsets, sizes
+
+
+# A splat's footprint radius, in standard deviations of its largest axis
+# (the 3-sigma extent the 3DGS rasterizer draws).
+FOOTPRINT_SIGMAS = 3.0
+
+
+def footprint_radii(log_scales, sigmas=FOOTPRINT_SIGMAS):
+    """World-space footprint radius per splat from its (N,3) log-scales."""
+    return sigmas * np.exp(np.max(log_scales, axis=1))
+
+
+def integral_masks(masks):
+    """
+    Summed-area tables of the binarized masks, concatenated flat.
+    Camera c's table is (H+1, W+1) int32 starting at offsets[c], with
+    S[v, u] = number of dynamic pixels above and left of (v, u), so any
+    box sum takes four reads.
+    Returns (flat, offsets).
+    """
+    sizes = [m.shape[:2] for m in masks]
+    lengths = np.array([(H + 1) * (W + 1) for H, W in sizes], dtype=np.int64)
+    offsets = np.zeros(len(masks), dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)[:-1]
+
+    flat = np.zeros(int(lengths.sum()), dtype=np.int32)
+    for off, m, (H, W) in zip(offsets, masks, sizes):
+        S = flat[off:off + (H + 1) * (W + 1)].reshape(H + 1, W + 1)
+        np.cumsum(m > 0, axis=0, dtype=np.int32, out=S[1:, 1:])
+        np.cumsum(S[1:, 1:], axis=1, out=S[1:, 1:])
+    return flat, offsets
+
+
+def project_footprint_boxes(P, focal, xyz, radii, sizes):
+    """
+    Project splats xyz (N,3) with world radii (N,) into all cameras of
+    P (C,3,4). focal: (C,2) (fx, fy) in the same pixel units as P.
+    Returns (u0, v0, u1, v1, valid), each (C,N): the inclusive pixel box
+    covered by each footprint, clipped to the image, and whether the splat
+    is in front of the camera with its box overlapping the image.
+    A zero radius gives the single pixel project_pixel_indices would pick.
+    """
+    C = P.shape[0]
+    sizes = np.asarray(sizes)
+    H = sizes[:, 0:1].astype(P.dtype)
+    W = sizes[:, 1:2].astype(P.dtype)
+
+    M = np.ascontiguousarray(P[:, :, :3].reshape(C * 3, 3))
+    t = P[:, :, 3].reshape(C * 3, 1)
+    pts = np.asarray(xyz, dtype=P.dtype)
+    focal = np.asarray(focal, dtype=P.dtype)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proj = (M @ pts.T + t).reshape(C, 3, -1)
+        depth = proj[:, 2]
+        inv_depth = 1.0 / depth
+        u = proj[:, 0] * inv_depth
+        v = proj[:, 1] * inv_depth
+        r = np.asarray(radii, dtype=P.dtype)[None, :] * inv_depth
+        ru = focal[:, 0:1] * r
+        rv = focal[:, 1:2] * r
+
+        valid = (
+            (depth > 0) &
+            (u + ru >= 0) & (u - ru < W) &
+            (v + rv >= 0) & (v - rv < H)
+        )
+
+        u0 = _clipped_pixel(u - ru, W, valid)
+        v0 = _clipped_pixel(v - rv, H, valid)
+        u1 = _clipped_pixel(u + ru, W, valid)
+        v1 = _clipped_pixel(v + rv, H, valid)
+    return u0, v0, u1, v1, valid
+
+
+def _clipped_pixel(x, limit, valid):
+    # Clip in float first so far-off (or NaN) coordinates cannot overflow.
+    np.clip(x, 0, limit - 1, out=x)
+    np.floor(x, out=x)
+    out = x.astype(np.int32)
+    out[~valid] = 0
+    return out
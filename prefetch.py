@@ -0,0 +1,97 @@
+import queue
+import threading
+
+# How often blocked queue operations wake up to check for shutdown.
+_POLL_S = 0.1
+
+_DONE = object()
+
+
+class _Failure:
+    """An exception raised by a stage, carried downstream to the consumer."""
+
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def _put(q, msg, stop):
+    while not stop.is_set():
+        try:
+            q.put(msg, timeout=_POLL_S)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_S)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def _feed(items, outbox, stop):
+    try:
+        for item in items:
+            if not _put(outbox, (item, item), stop):
+                return
+    except BaseException as e:
+        _put(outbox, (None, _Failure(e)), stop)
+    _put(outbox, _DONE, stop)
+
+
+def _work(fn, inbox, outbox, stop):
+    while True:
+        msg = _get(inbox, stop)
+        if msg is _DONE:
+            _put(outbox, _DONE, stop)
+            return
+        item, value = msg
+        if not isinstance(value, _Failure):
+            try:
+                value = fn(item, value)
+            except BaseException as e:
+                value = _Failure(e)
+        if not _put(outbox, (item, value), stop):
+            return
+
+
+def staged_map(items, stages, depth=2):
+    """
+    Push items through a chain of stages, each running in its own thread,
+    and yield (item, result) in input order.
+
+    stages: functions fn(item, value) -> value; the first receives the item
+    itself as value. Consecutive stages are linked by queues of at most
+    depth entries, so at most about len(stages) * (depth + 1) items are in
+    flight at once. Stages overlap as long as they release the GIL (file
+    I/O, PNG decode, numpy kernels).
+
+    An exception in any stage is re-raised here for its item. Closing the
+    generator early (or an exception) stops every thread.
+    """
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=depth) for _ in range(len(stages) + 1)]
+    threads = [threading.Thread(target=_feed, args=(items, queues[0], stop), daemon=True)]
+    for k, fn in enumerate(stages):
+        threads.append(threading.Thread(target=_work, args=(fn, queues[k], queues[k + 1], stop),
+                                        daemon=True))
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            msg = queues[-1].get()
+            if msg is _DONE:
+                break
+            item, value = msg
+            if isinstance(value, _Failure):
+                raise value.exc
+            yield item, value
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
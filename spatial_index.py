@@ -0,0 +1,136 @@
+import numpy as np
+
+# Average number of splats per occupied cell when the cell size is derived
+# from the cloud; small enough for tight bounds, large enough that the
+# per-cell corner projection stays negligible next to the splats.
+POINTS_PER_CELL = 256
+
+# Bits per axis in the packed cell key. Points beyond the 2^21-cell range
+# are clamped into the border cells, which only loosens those cells' bounds.
+_KEY_BITS = 21
+
+# VoxelGrid.refit gives up once the cells' mean extent exceeds this many
+# cell sizes: splats have drifted far enough from the cells they were sorted
+# into that a fresh grid would cull noticeably more.
+REFIT_MAX_CELLS = 2.0
+
+# The 8 corners of a unit box, as (lo, hi) selectors per axis.
+_CORNERS = np.array([[i >> 2 & 1, i >> 1 & 1, i & 1] for i in range(8)], dtype=bool)
+
+
+class VoxelGrid:
+    """
+    Uniform voxel grid over Gaussian positions.
+
+    Splats are sorted by cell so each cell is a contiguous range of
+    self.order, and every cell keeps the tight AABB of its own splats.
+    That makes cell-level culling conservative: a cell is only dropped when
+    none of its splats can land inside the tested pixel rectangle.
+    """
+
+    def __init__(self, xyz, cell_size=None):
+        xyz = np.asarray(xyz)
+        N = xyz.shape[0]
+        self.num_points = N
+
+        if N == 0:
+            self.cell_size = cell_size or 1.0
+            self.order = np.zeros(0, dtype=np.int64)
+            self.starts = np.zeros(1, dtype=np.int64)
+            self._set_bounds(np.zeros((0, 3), dtype=xyz.dtype), np.zeros((0, 3), dtype=xyz.dtype))
+            return
+
+        if cell_size is None:
+            # Size cells from the 1st-99th percentile box so a few far-away
+            # floaters do not blow up the cell size for the whole scene.
+            lo_p, hi_p = np.percentile(xyz, [1, 99], axis=0)
+            volume = float(np.prod(np.maximum(hi_p - lo_p, 1e-6)))
+            cell_size = (volume / max(1, N // POINTS_PER_CELL)) ** (1.0 / 3.0)
+        self.cell_size = cell_size
+
+        lo = xyz.min(axis=0)
+        k = np.floor((xyz - lo) / cell_size).astype(np.int64)
+        np.clip(k, 0, (1 << _KEY_BITS) - 1, out=k)
+        keys = (k[:, 0] << (2 * _KEY_BITS)) | (k[:, 1] << _KEY_BITS) | k[:, 2]
+
+        self.order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self.order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        self.starts = np.append(starts, N)
+
+        pts = np.take(xyz, self.order, axis=0)
+        self._set_bounds(np.minimum.reduceat(pts, starts, axis=0),
+                         np.maximum.reduceat(pts, starts, axis=0))
+
+    def _set_bounds(self, lo, hi):
+        self.cell_lo = lo
+        self.cell_hi = hi
+        # (M, 8, 3) box corners, shared by every camera's cells_in_view.
+        self.corners = np.where(_CORNERS[None], hi[:, None, :], lo[:, None, :])
+
+    def refit(self, xyz):
+        """
+        Move the grid to new positions of the same splats: every splat stays
+        in its cell and each cell's AABB is recomputed, which keeps culling
+        conservative without sorting the splats again. Returns False when
+        the cells have grown too loose to be worth keeping (see
+        REFIT_MAX_CELLS); the grid is then still correct, only coarser.
+        """
+        if self.num_points == 0:
+            return True
+        pts = np.take(xyz, self.order, axis=0)
+        self._set_bounds(np.minimum.reduceat(pts, self.starts[:-1], axis=0),
+                         np.maximum.reduceat(pts, self.starts[:-1], axis=0))
+        extent = (self.cell_hi - self.cell_lo).max(axis=1)
+        return bool(extent.mean() <= REFIT_MAX_CELLS * self.cell_size)
+
+    @property
+    def num_cells(self):
+        return self.starts.size - 1
+
+    def cells_in_view(self, P, rect):
+        """
+        Boolean (num_cells,) mask of cells that may project into rect.
+        P: (3,4) world -> pixel projection.
+        rect: (u0, v0, u1, v1) inclusive pixel bounds to test against.
+        Cells entirely behind the camera are dropped; cells straddling the
+        image plane are always kept.
+        """
+        proj = self.corners @ P[:, :3].T + P[:, 3]  # (M, 8, 3)
+        depth = proj[..., 2]
+
+        in_front = depth > 0
+        all_front = in_front.all(axis=1)
+        any_front = in_front.any(axis=1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u = proj[..., 0] / depth
+            v = proj[..., 1] / depth
+
+        u0, v0, u1, v1 = rect
+        # floor(u) in [u0, u1]  <=>  u in [u0, u1 + 1)
+        overlap = (
+            (u.max(axis=1) >= u0) & (u.min(axis=1) < u1 + 1) &
+            (v.max(axis=1) >= v0) & (v.min(axis=1) < v1 + 1)
+        )
+        return np.where(all_front, overlap, any_front)
+
+    def points_in_cells(self, cell_mask):
+        """Indices (into the original xyz) of all splats in the selected cells."""
+        return self.order[self.positions_in_cells(cell_mask)]
+
+    def positions_in_cells(self, cell_mask):
+        """
+        Positions in self.order of all splats in the selected cells, in
+        increasing order: indices into xyz[self.order].
+        """
+        sel = np.flatnonzero(cell_mask)
+        starts = self.starts[sel]
+        lengths = self.starts[sel + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        # Concatenate the ranges [start, start+length) without a Python loop.
+        run_offsets = np.cumsum(lengths) - lengths
+        return np.repeat(starts - run_offsets, lengths) + np.arange(total)
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from batch_pipeline import enqueue, scene_jobs
+from build_static_dynamic import Scene
+from work_queue import WorkQueue
+
+
+def _make_scene(root, frames):
+    scene = Scene(str(root))
+    os.makedirs(scene.ply_dir)
+    os.makedirs(scene.data_root)
+    for i in frames:
+        open(scene.frame_ply_path(i), "wb").close()
+    open(scene.cam_cfg_path, "w").close()
+    return scene
+
+
+def test_scene_jobs_split_frames(tmp_path):
+    scene = _make_scene(tmp_path / "s", range(10))
+    jobs = scene_jobs(scene, frames_per_job=4, static_frame=30, options={"cull": True})
+
+    assert [job["frames"] for _, job in jobs] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    # Frame 30 is missing, so every job takes the middle frame.
+    assert {job["static_frame"] for _, job in jobs} == {5}
+    assert all(job["options"] == {"cull": True} for _, job in jobs)
+    assert len({job_id for job_id, _ in jobs}) == 3
+
+
+def test_consensus_scene_is_one_job(tmp_path):
+    scene = _make_scene(tmp_path / "s", range(10))
+    jobs = scene_jobs(scene, frames_per_job=4, options={"consensus": True})
+    assert [job["frames"] for _, job in jobs] == [list(range(10))]
+
+
+def test_enqueue_is_idempotent_and_ids_unique(tmp_path):
+    _make_scene(tmp_path / "a" / "cap", range(3))
+    _make_scene(tmp_path / "b" / "cap", range(3))
+    os.makedirs(tmp_path / "empty")
+    queue = WorkQueue(str(tmp_path / "queue"))
+
+    pattern = str(tmp_path / "*" / "cap")
+    enqueue(queue, [pattern, str(tmp_path / "empty")], frames_per_job=2)
+    assert queue.counts()["pending"] == 4  # same scene name, different parents
+
+    enqueue(queue, [pattern], frames_per_job=2)
+    assert queue.counts()["pending"] == 4
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,53 @@
+import os
+import shutil
+
+import pytest
+
+from benchmark import make_synthetic_scene
+from build_static_dynamic import Scene, watch_pipeline
+from gaussian_io import ply_vertex_count
+from pipeline_utils import load_cameras
+
+
+def _capture(root, frames, num_splats=2000, num_cams=3):
+    """A scene whose frames are all copies of one synthetic frame."""
+    src = str(root / "src")
+    os.makedirs(src)
+    make_synthetic_scene(src, num_splats, num_cams=num_cams)
+    scene = Scene(str(root / "cap"))
+    os.makedirs(scene.ply_dir)
+    os.makedirs(scene.masks_dir)
+    shutil.copy(os.path.join(src, "camera_config.json"), scene.cam_cfg_path)
+    cams = load_cameras(scene.cam_cfg_path)
+    for i in frames:
+        shutil.copy(os.path.join(src, "scene.ply"), scene.frame_ply_path(i))
+        for cam in cams:
+            folder = os.path.join(scene.masks_dir, cam.mask_folder)
+            os.makedirs(folder, exist_ok=True)
+            shutil.copy(os.path.join(src, "masks", cam.mask_folder, "000000.png"),
+                        os.path.join(folder, f"{i:06d}.png"))
+    return scene
+
+
+@pytest.mark.parametrize("content", [
+    b"",
+    b"garbage",
+    b"ply\nformat binary_little_endian 1.0\nend_header\n",
+    b"ply\nformat binary_little_endian 1.0\nelement vertex 10\nproperty float x\nend_header\n",
+])
+def test_watch_skips_malformed_frame(tmp_path, content):
+    scene = _capture(tmp_path, range(4))
+    with open(scene.frame_ply_path(2), "wb") as f:
+        f.write(content)
+
+    watch_pipeline(scene=scene, static_frame=0, poll_s=0, settle_s=0, idle_exit_s=0)
+
+    for i in (0, 1, 3):
+        dynamic_path, final_path = scene.frame_output_paths(i)
+        assert ply_vertex_count(final_path) == 2000
+        assert os.path.isfile(dynamic_path)
+    assert not any(os.path.exists(p) for p in scene.frame_output_paths(2))
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from benchmark import make_synthetic_scene
+from camera_rig import build_camera_rig
+from classify_splats import (
+    CameraShardPool,
+    FrameViews,
+    GridCache,
+    ProjectionCache,
+    VoteWorkspace,
+    classify_splats,
+    count_cached_votes,
+    count_footprint_votes,
+    count_votes,
+    count_votes_active,
+)
+from gaussian_io import load_ply_gaussians
+from metrics import Metrics
+from pipeline_utils import load_cameras, load_masks_for_frame
+from spatial_index import VoxelGrid
+
+
+@pytest.fixture(scope="module")
+def frame(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("scene"))
+    make_synthetic_scene(root, 20000, num_cams=8)
+    cams = load_cameras(f"{root}/camera_config.json")
+    masks = load_masks_for_frame(0, cams, masks_dir=f"{root}/masks")
+    g = load_ply_gaussians(f"{root}/scene.ply")
+    xyz = np.ascontiguousarray(np.stack([g["x"], g["y"], g["z"]], axis=-1))
+    return cams, masks, g, xyz
+
+
+@pytest.fixture(scope="module")
+def shards():
+    with CameraShardPool(3) as pool:
+        yield pool
+
+
+def _moved(xyz, seed=1):
+    """xyz with a tenth of the splats nudged, as from one frame to the next."""
+    rng = np.random.default_rng(seed)
+    moved = xyz.copy()
+    pick = rng.random(len(xyz)) < 0.1
+    moved[pick] += rng.normal(0.0, 0.2, (int(pick.sum()), 3)).astype(np.float32)
+    return moved
+
+
+def test_synthetic_scene_has_both_labels(frame):
+    cams, masks, _, xyz = frame
+    votes = count_votes(xyz, FrameViews(cams, masks))
+    for thresh in (1, 3):
+        assert 0 < np.count_nonzero(votes >= thresh) < len(xyz)
+
+
+def test_exact_vote_paths_match_count_votes(frame, shards):
+    cams, masks, _, xyz = frame
+    views = FrameViews(cams, masks)
+    expected = count_votes(xyz, views)
+
+    np.testing.assert_array_equal(count_votes(xyz, views, index=VoxelGrid(xyz)), expected)
+    np.testing.assert_array_equal(shards.count_votes(xyz, views), expected)
+    # Small chunks through one reused workspace.
+    workspace = VoteWorkspace()
+    for _ in range(2):
+        np.testing.assert_array_equal(count_votes(xyz, views, 1000, workspace=workspace), expected)
+    # A zero footprint is point sampling.
+    np.testing.assert_array_equal(count_footprint_votes(xyz, np.zeros(len(xyz)), views), expected)
+
+
+def test_cached_and_refit_paths_follow_moved_splats(frame):
+    cams, masks, _, xyz = frame
+    views = FrameViews(cams, masks)
+    cache, grids = ProjectionCache(), GridCache()
+    for positions in (xyz, _moved(xyz), _moved(xyz, seed=2)):
+        expected = count_votes(positions, views)
+        np.testing.assert_array_equal(count_cached_votes(positions, views, cache), expected)
+        index = grids.grid_for(positions)
+        np.testing.assert_array_equal(count_votes(positions, views, index=index), expected)
+
+
+@pytest.mark.parametrize("thresh", [1, 3])
+def test_label_paths_match_count_votes(frame, shards, thresh):
+    cams, masks, g, xyz = frame
+    views = FrameViews(cams, masks)
+    expected = count_votes(xyz, views) >= thresh
+
+    np.testing.assert_array_equal(count_votes_active(xyz, views, thresh) >= thresh, expected)
+    np.testing.assert_array_equal(count_votes_active(xyz, views, thresh, group=1) >= thresh, expected)
+
+    rig = build_camera_rig(cams, [m.shape for m in masks])
+    for kwargs in ({}, {"cull": True}, {"early_exit": True}, {"shards": shards},
+                   {"cache": ProjectionCache()}, {"rig": rig}, {"cull": True, "grids": GridCache()}):
+        static_mask, dynamic_mask = classify_splats(g, cams, masks, thresh=thresh, **kwargs)
+        np.testing.assert_array_equal(dynamic_mask, expected, err_msg=str(sorted(kwargs)))
+        np.testing.assert_array_equal(static_mask, ~expected)
+
+
+def test_debug_hit_counts_match_across_paths(frame, shards):
+    cams, masks, g, _ = frame
+
+    def hits(**kwargs):
+        metrics = Metrics(debug=True)
+        classify_splats(g, cams, masks, thresh=1, metrics=metrics, **kwargs)
+        record = metrics.emit()
+        return record["valid_hits_per_camera"], record["dynamic_hits_per_camera"], record["vote_histogram"]
+
+    expected = hits()
+    assert len(expected[0]) == len(cams) and sum(expected[1]) > 0
+    assert hits(shards=shards) == expected
+    assert hits(early_exit=True) == expected
+    assert hits(cull=True)[1] == expected[1]  # culled pairs are never counted as valid
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
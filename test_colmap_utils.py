@@ -0,0 +1,61 @@
+import struct
+
+import numpy as np
+import pytest
+
+from colmap_text_utils import read_points3D_text
+from colmap_utils import POINT3D_HEAD_DTYPE, TRACK_ELEM_DTYPE, read_points3D_binary
+
+POINTS = [
+    # id, xyz, rgb, error, track [(image_id, point2D_idx)]
+    (1, (0.5, -1.0, 2.25), (255, 0, 7), 0.125, [(1, 10), (3, 42)]),
+    (7, (3.0, 4.0, -5.5), (1, 2, 3), 1.5, []),
+    (12, (-0.25, 0.0, 9.0), (9, 8, 7), 0.0, [(2, 0), (1, 5), (4, 11)]),
+]
+
+
+def _write_binary(path, points):
+    parts = [struct.pack("<Q", len(points))]
+    for pid, xyz, rgb, error, track in points:
+        head = np.zeros(1, dtype=POINT3D_HEAD_DTYPE)
+        head["point3D_id"], head["xyz"], head["rgb"] = pid, xyz, rgb
+        head["error"], head["track_length"] = error, len(track)
+        parts.append(head.tobytes())
+        parts.append(np.array(track, dtype=np.int32).reshape(-1, 2).view(TRACK_ELEM_DTYPE).tobytes())
+    with open(path, "wb") as f:
+        f.write(b"".join(parts))
+
+
+def _write_text(path, points):
+    with open(path, "w") as f:
+        f.write("# 3D point list\n")
+        for pid, xyz, rgb, error, track in points:
+            fields = [pid, *xyz, *rgb, error] + [v for pair in track for v in pair]
+            f.write(" ".join(str(v) for v in fields) + "\n")
+
+
+def test_points3D_binary_and_text_agree(tmp_path):
+    _write_binary(tmp_path / "points3D.bin", POINTS)
+    _write_text(tmp_path / "points3D.txt", POINTS)
+    binary = read_points3D_binary(str(tmp_path / "points3D.bin"), tracks=True)
+    text = read_points3D_text(str(tmp_path / "points3D.txt"), tracks=True)
+
+    assert binary.keys() == text.keys()
+    for name in binary:
+        assert binary[name].dtype == text[name].dtype, name
+        np.testing.assert_array_equal(binary[name], text[name], err_msg=name)
+    np.testing.assert_array_equal(binary["track_lengths"], [2, 0, 3])
+    np.testing.assert_array_equal(binary["track_image_ids"], [1, 3, 2, 1, 4])
+
+
+def test_points3D_binary_rejects_truncated_file(tmp_path):
+    path = tmp_path / "points3D.bin"
+    _write_binary(path, POINTS)
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 8)
+    with pytest.raises(ValueError, match="Truncated"):
+        read_points3D_binary(str(path), tracks=True)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,170 @@
+import numpy as np
+import pytest
+
+from gaussian_io import (
+    COMPRESSED_CHUNK,
+    GAUSSIAN_DTYPE,
+    SH_C0,
+    GaussianCloud,
+    GaussianSequence,
+    compressed_prefix,
+    load_compressed_ply,
+    load_ply_gaussians,
+    morton_order,
+    ply_vertex_count,
+    save_compressed_ply,
+    save_gaussian_sequence,
+    save_ply_gaussians,
+)
+
+
+def _gaussians(n, seed=0):
+    rng = np.random.default_rng(seed)
+    g = np.zeros(n, dtype=GAUSSIAN_DTYPE)
+    g["x"], g["y"], g["z"] = rng.normal(0.0, 3.0, (3, n))
+    g["f_dc"] = rng.normal(0.0, 1.0, (n, 3))
+    g["opacity"] = rng.normal(0.0, 2.0, n)
+    g["scale"] = rng.uniform(-6.0, -2.0, (n, 3))
+    q = rng.normal(size=(n, 4))
+    g["rot"] = q / np.linalg.norm(q, axis=1, keepdims=True)
+    return g
+
+
+def _sorted(g):
+    return g[morton_order(np.stack([g["x"], g["y"], g["z"]], axis=-1))]
+
+
+def _assert_close(decoded, original):
+    """Equal up to the compressed layout's quantization."""
+    xyz = np.stack([original["x"], original["y"], original["z"]], axis=-1)
+    out = np.stack([decoded["x"], decoded["y"], decoded["z"]], axis=-1)
+    np.testing.assert_allclose(out, xyz, atol=np.ptp(xyz) / 1023)
+    np.testing.assert_allclose(decoded["scale"], original["scale"], atol=4.0 / 1023)
+    np.testing.assert_allclose(decoded["f_dc"] * SH_C0, original["f_dc"] * SH_C0,
+                               atol=np.ptp(original["f_dc"] * SH_C0) / 255)
+    alpha = lambda o: 1.0 / (1.0 + np.exp(-o.astype(np.float64)))
+    np.testing.assert_allclose(alpha(decoded["opacity"]), alpha(original["opacity"]), atol=1.0 / 255)
+    # q and -q are the same rotation.
+    dots = np.abs((decoded["rot"].astype(np.float64) * original["rot"]).sum(axis=1))
+    assert dots.min() > 0.999
+    assert not decoded["nx"].any() and not decoded["ny"].any() and not decoded["nz"].any()
+
+
+def test_ply_round_trip(tmp_path):
+    g = _gaussians(1000)
+    path = str(tmp_path / "g.ply")
+    save_ply_gaussians(path, g)
+    assert ply_vertex_count(path) == 1000
+    assert load_ply_gaussians(path).tobytes() == g.tobytes()
+    assert np.asarray(load_ply_gaussians(path, mmap_mode="r")).tobytes() == g.tobytes()
+
+
+@pytest.mark.parametrize("content", [b"", b"garbage", b"ply\nend_header\n"])
+def test_ply_rejects_bad_header(tmp_path, content):
+    path = str(tmp_path / "g.ply")
+    with open(path, "wb") as f:
+        f.write(content)
+    with pytest.raises(ValueError, match="PLY"):
+        ply_vertex_count(path)
+
+
+@pytest.mark.parametrize("mmap_mode", [None, "r"])
+def test_ply_rejects_truncated_payload(tmp_path, mmap_mode):
+    path = str(tmp_path / "g.ply")
+    save_ply_gaussians(path, _gaussians(100))
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 4)
+    with pytest.raises(ValueError, match="Truncated"):
+        load_ply_gaussians(path, mmap_mode=mmap_mode)
+
+
+@pytest.mark.parametrize("n", [0, 1, COMPRESSED_CHUNK, 3 * COMPRESSED_CHUNK + 17])
+def test_compressed_round_trip(tmp_path, n):
+    g = _gaussians(n)
+    path = str(tmp_path / "c.ply")
+    assert save_compressed_ply(path, g) == n
+    assert ply_vertex_count(path) == n
+
+    decoded = load_ply_gaussians(path)  # decoded transparently
+    assert decoded.dtype == GAUSSIAN_DTYPE and len(decoded) == n
+    if n:
+        _assert_close(decoded, _sorted(g))
+
+
+def test_compressed_with_prefix_holds_both_parts(tmp_path):
+    static, dynamic = _gaussians(1000, seed=1), _gaussians(300, seed=2)
+    path = str(tmp_path / "final.ply")
+    save_compressed_ply(path, dynamic, prefix=compressed_prefix(static))
+
+    decoded = load_compressed_ply(path)
+    assert len(decoded) == 1300
+    head = 1000 - 1000 % COMPRESSED_CHUNK
+    _assert_close(decoded[:head], _sorted(static)[:head])
+    leftover = np.concatenate([_sorted(static)[head:], dynamic])
+    _assert_close(decoded[head:], _sorted(leftover))
+
+
+def test_compressed_rejects_unknown_chunk_layout(tmp_path):
+    path = str(tmp_path / "c.ply")
+    save_compressed_ply(path, _gaussians(10))
+    with open(path, "rb") as f:
+        data = f.read()
+    data = data.replace(b"property float max_b\n", b"", 1)
+    with open(path, "wb") as f:
+        f.write(data)
+    with pytest.raises(ValueError, match="chunk layout"):
+        load_compressed_ply(path)
+
+
+def test_compressed_rejects_truncated_file(tmp_path):
+    path = str(tmp_path / "c.ply")
+    save_compressed_ply(path, _gaussians(10))
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 8)
+    with pytest.raises(ValueError, match="Truncated"):
+        load_compressed_ply(path)
+
+
+def test_sequence_round_trip(tmp_path):
+    static = _gaussians(500, seed=1)
+    static_path = str(tmp_path / "static.ply")
+    save_ply_gaussians(static_path, static)
+
+    frames = {k: _gaussians(50 + k, seed=10 + k) for k in range(4)}
+    ply_path = str(tmp_path / "dyn0.ply")
+    save_ply_gaussians(ply_path, frames[0])
+    compressed_path = str(tmp_path / "dyn3.ply")
+    save_compressed_ply(compressed_path, frames[3])
+    selected = GaussianCloud(np.concatenate([frames[2], static])).select(np.arange(len(frames[2])))
+    sources = [(0, ply_path), (1, frames[1]), (2, selected), (3, compressed_path),
+               (7, np.zeros(0, dtype=GAUSSIAN_DTYPE))]
+
+    path = str(tmp_path / "s.gseq")
+    save_gaussian_sequence(path, static_path, sources)
+
+    seq = GaussianSequence(path)
+    assert seq.frames == [0, 1, 2, 3, 7] and len(seq) == 5
+    for i in range(3):
+        s, d = seq.frame(i)
+        assert np.asarray(s.to_records()).tobytes() == static.tobytes()
+        assert np.asarray(d.to_records()).tobytes() == frames[i].tobytes()
+    decoded = load_compressed_ply(compressed_path)
+    assert np.asarray(seq.dynamic(3).to_records()).tobytes() == decoded.tobytes()
+    assert len(seq.dynamic(7)) == 0
+
+
+def test_sequence_rejects_bad_and_truncated_files(tmp_path):
+    path = str(tmp_path / "s.gseq")
+    save_gaussian_sequence(path, _gaussians(10), [(0, _gaussians(20))])
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 4)
+    with pytest.raises(ValueError, match="Truncated"):
+        GaussianSequence(path).dynamic(0)
+
+    save_ply_gaussians(path, _gaussians(10))
+    with pytest.raises(ValueError, match="Not a Gaussian sequence"):
+        GaussianSequence(path)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
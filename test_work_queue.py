@@ -0,0 +1,159 @@
+import os
+import time
+import multiprocessing as mp
+
+import pytest
+
+from work_queue import FileLock, WorkQueue
+
+
+def _age(path, seconds):
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+def _drain(root):
+    queue = WorkQueue(root)
+    taken = []
+    while True:
+        claimed = queue.claim()
+        if claimed is None:
+            return taken
+        job_id, job = claimed
+        taken.append(job_id)
+        queue.finish(job_id, job)
+
+
+def _count_under_lock(lock_path, counter_path, rounds):
+    for _ in range(rounds):
+        with FileLock(lock_path, poll_s=0.001):
+            with open(counter_path) as f:
+                value = int(f.read())
+            time.sleep(0.001)
+            with open(counter_path, "w") as f:
+                f.write(str(value + 1))
+
+
+def test_put_skips_known_jobs(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    assert queue.put("a", {"n": 1})
+    assert not queue.put("a", {"n": 2})
+    assert queue.counts() == {"pending": 1, "claimed": 0, "done": 0, "failed": 0}
+
+
+def test_claim_of_old_job_is_not_stale(tmp_path):
+    queue = WorkQueue(str(tmp_path), lease_s=60)
+    queue.put("a", {"n": 1})
+    _age(queue._path("pending", "a"), 3600)
+
+    job_id, job = queue.claim()
+    assert (job_id, job["n"]) == ("a", 1)
+    assert queue.requeue_stale() == []
+    assert queue.state_of("a") == "claimed"
+
+
+def test_two_processes_claim_each_job_once(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    ids = [f"job{k:03d}" for k in range(40)]
+    for job_id in ids:
+        queue.put(job_id, {})
+
+    with mp.Pool(2) as pool:
+        taken = pool.map(_drain, [str(tmp_path)] * 2)
+
+    assert sorted(taken[0] + taken[1]) == ids
+    assert queue.jobs("done") == ids
+
+
+def test_requeue_stale_and_finish_after_requeue(tmp_path):
+    queue = WorkQueue(str(tmp_path), lease_s=60)
+    queue.put("a", {})
+    job_id, job = queue.claim()
+
+    _age(queue._path("claimed", job_id), 120)
+    assert queue.requeue_stale() == ["a"]
+
+    queue.finish(job_id, job)
+    queue.finish(job_id, job, error="boom")
+    assert queue.state_of("a") == "pending"
+    assert queue.jobs("failed") == []
+
+
+def test_finish_after_reclaim_leaves_new_claim_alone(tmp_path):
+    first = WorkQueue(str(tmp_path), lease_s=60)
+    second = WorkQueue(str(tmp_path), lease_s=60)
+    first.put("a", {})
+    job_id, stale_job = first.claim()
+    _age(first._path("claimed", job_id), 120)
+
+    _, job = second.claim()  # requeues, then claims again
+    first.finish(job_id, stale_job, error="boom")
+    assert first.jobs("failed") == []
+    assert first.state_of("a") == "claimed"
+
+    second.finish(job_id, job, error="boom")
+    assert first.jobs("failed") == ["a"]
+    assert first.retry_failed() == ["a"]
+    assert first.counts() == {"pending": 1, "claimed": 0, "done": 0, "failed": 0}
+
+
+def test_lock_breaks_stale_lock(tmp_path):
+    path = str(tmp_path / "x.lock")
+    with open(path, "w") as f:
+        f.write("dead:1")
+    _age(path, 3600)
+
+    with FileLock(path, stale_s=60, poll_s=0.001):
+        assert os.path.isfile(path)
+    assert not os.path.exists(path)
+    assert [n for n in os.listdir(tmp_path) if n.endswith(".stale")] == []
+
+
+def test_lock_waits_for_live_lock(tmp_path):
+    path = str(tmp_path / "x.lock")
+    holder = FileLock(path, stale_s=60).acquire()
+    waiter = FileLock(path, stale_s=60)
+    waiter._break_if_stale()
+    assert os.path.isfile(path)
+    holder.release()
+
+
+def test_breaking_keeps_lock_recreated_after_stale_stat(tmp_path):
+    path = str(tmp_path / "x.lock")
+    with open(path, "w") as f:
+        f.write("dead:1")
+    _age(path, 3600)
+    seen = os.stat(path)
+
+    # Another waiter breaks the same stale lock and takes the lock...
+    os.remove(path)
+    holder = FileLock(path, stale_s=60).acquire()
+    # ...before this one acts on its stale stat.
+    FileLock(path, stale_s=60)._break(seen)
+
+    assert os.path.isfile(path)
+    with open(path) as f:
+        assert f.read() != "dead:1"
+    holder.release()
+
+
+def test_lock_excludes_two_processes(tmp_path):
+    lock_path = str(tmp_path / "counter.lock")
+    counter_path = str(tmp_path / "counter")
+    with open(counter_path, "w") as f:
+        f.write("0")
+
+    procs = [mp.Process(target=_count_under_lock, args=(lock_path, counter_path, 50))
+             for _ in range(2)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        assert p.exitcode == 0
+
+    with open(counter_path) as f:
+        assert int(f.read()) == 100
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+
+# A lock or job claim whose file has not been touched for this long is
+# assumed abandoned (its holder crashed or lost its machine). Holders touch
+# their files every quarter of it, so only the clock skew between machines
+# sharing the directory has to stay well below these.
+LOCK_STALE_S = 120
+JOB_LEASE_S = 600
+
+LOCK_POLL_S = 0.2
+
+QUEUE_STATES = ("pending", "claimed", "done", "failed")
+
+
+def owner_id():
+    """host:pid, written into locks and failed jobs to tell who held them."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Heartbeat:
+    """Touch path every interval seconds from a daemon thread until stopped."""
+
+    def __init__(self, path, interval):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(path, interval), daemon=True)
+        self._thread.start()
+
+    def _run(self, path, interval):
+        while not self._stop.wait(interval):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return  # lock broken or job requeued by someone else
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FileLock:
+    """
+    Exclusive lock across processes and machines sharing a directory,
+    held by creating path with O_CREAT | O_EXCL (atomic on local
+    filesystems and NFSv3+). The holder keeps the file's mtime fresh; a
+    lock left untouched for stale_s seconds is broken.
+    """
+
+    def __init__(self, path, stale_s=LOCK_STALE_S, poll_s=LOCK_POLL_S):
+        self.path = path
+        self.stale_s = stale_s
+        self.poll_s = poll_s
+        self._heartbeat = None
+
+    def acquire(self):
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                self._break_if_stale()
+                time.sleep(self.poll_s)
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(owner_id())
+            self._heartbeat = Heartbeat(self.path, self.stale_s / 4)
+            return self
+
+    def _break_if_stale(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if time.time() - st.st_mtime > self.stale_s:
+            self._break(st)
+
+    def _break(self, st):
+        """
+        Remove the lock file if it is still the stale one seen in st. A
+        plain remove could hit a fresh lock that another waiter created
+        after breaking the same stale one, so the file is first renamed
+        away atomically and only deleted if it is that same untouched file.
+        """
+        grave = f"{self.path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(self.path, grave)
+        except FileNotFoundError:
+            return  # someone else broke it
+        gst = os.stat(grave)
+        if (gst.st_ino, gst.st_mtime_ns) == (st.st_ino, st.st_mtime_ns):
+            print(f"[WARN] Breaking stale lock ({time.time() - st.st_mtime:.0f}s old): {self.path}")
+        else:
+            # A live lock: put it back, unless yet another one took its place.
+            try:
+                os.link(grave, self.path)
+            except FileExistsError:
+                print(f"[WARN] Lost a live lock while breaking a stale one: {self.path}")
+        os.remove(grave)
+
+    def release(self):
+        self._heartbeat.stop()
+        self._heartbeat = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class WorkQueue:
+    """
+    A directory of JSON jobs that any number of workers, on one machine or
+    several mounting the same (NFS) path, drain without a central service:
+
+      root/pending/<job>.json   waiting
+      root/claimed/<job>.json   being run; its mtime is the worker's heartbeat
+      root/done/<job>.json
+      root/failed/<job>.json    with the error and the worker that hit it
+
+    Every transition is a rename, so exactly one worker wins each claim.
+    A claim whose heartbeat is older than lease_s goes back to pending, so
+    a job may run twice if its worker stalls; jobs must be idempotent.
+    """
+
+    def __init__(self, root, lease_s=JOB_LEASE_S):
+        self.root = root
+        self.lease_s = lease_s
+        for state in QUEUE_STATES:
+            os.makedirs(os.path.join(root, state), exist_ok=True)
+
+    def _path(self, state, job_id):
+        return os.path.join(self.root, state, job_id + ".json")
+
+    def jobs(self, state):
+        """Sorted ids of the jobs in state."""
+        names = os.listdir(os.path.join(self.root, state))
+        return sorted(n[:-5] for n in names if n.endswith(".json") and not n.startswith("."))
+
+    def counts(self):
+        return {state: len(self.jobs(state)) for state in QUEUE_STATES}
+
+    def state_of(self, job_id):
+        for state in QUEUE_STATES:
+            if os.path.isfile(self._path(state, job_id)):
+                return state
+        return None
+
+    def _publish(self, job, path):
+        # Written under a hidden name first, so readers never see half a job.
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(job, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def put(self, job_id, job):
+        """Add job unless a job with this id is already known. Returns True if added."""
+        if self.state_of(job_id) is not None:
+            return False
+        self._publish(job, self._path("pending", job_id))
+        return True
+
+    def claim(self):
+        """
+        Take the first pending job. Returns (job_id, job), or None if none is
+        left. job["claim"] is a token unique to this claim, which finish uses
+        to tell whether the claim is still ours.
+        """
+        self.requeue_stale()
+        for job_id in self.jobs("pending"):
+            pending_path = self._path("pending", job_id)
+            claimed_path = self._path("claimed", job_id)
+            try:
+                # Fresh mtime first: a job queued long ago must not land in
+                # claimed/ looking stale to a concurrent requeue_stale.
+                os.utime(pending_path)
+                os.rename(pending_path, claimed_path)
+                with open(claimed_path, "r") as f:
+                    job = json.load(f)
+            except FileNotFoundError:
+                continue  # another worker got there first
+            job["claim"] = uuid.uuid4().hex
+            self._publish(job, claimed_path)
+            return job_id, job
+        return None
+
+    def _owns(self, job_id, job):
+        """True if claimed/<job_id> is still the claim job was taken with."""
+        try:
+            with open(self._path("claimed", job_id), "r") as f:
+                return json.load(f).get("claim") == job.get("claim")
+        except FileNotFoundError:
+            return False
+
+    def heartbeat(self, job_id):
+        """Context manager that keeps a claim alive while its job runs."""
+        return Heartbeat(self._path("claimed", job_id), self.lease_s / 4)
+
+    def finish(self, job_id, job, error=None):
+        """
+        Move a claimed job to done, or to failed with error. Nothing is
+        recorded if the claim was requeued (and maybe claimed again) while
+        the job ran; the job's current holder records it instead.
+        """
+        claimed_path = self._path("claimed", job_id)
+        if not self._owns(job_id, job):
+            print(f"[WARN] Job {job_id} was requeued while it ran")
+            return
+        if error is None:
+            try:
+                os.rename(claimed_path, self._path("done", job_id))
+            except FileNotFoundError:
+                print(f"[WARN] Job {job_id} was requeued while it ran")
+            return
+
+        self._publish(dict(job, error=error, worker=owner_id()), self._path("failed", job_id))
+        try:
+            os.remove(claimed_path)
+        except FileNotFoundError:
+            pass
+
+    def requeue_stale(self):
+        """Return claims whose heartbeat stopped to pending. Returns their ids."""
+        requeued = []
+        now = time.time()
+        for job_id in self.jobs("claimed"):
+            claimed_path = self._path("claimed", job_id)
+            try:
+                if now - os.stat(claimed_path).st_mtime <= self.lease_s:
+                    continue
+                os.rename(claimed_path, self._path("pending", job_id))
+            except FileNotFoundError:
+                continue
+            print(f"[WARN] Requeued stale job: {job_id}")
+            requeued.append(job_id)
+        return requeued
+
+    def retry_failed(self):
+        """Move every failed job back to pending. Returns their ids."""
+        retried = []
+        for job_id in self.jobs("failed"):
+            failed_path = self._path("failed", job_id)
+            try:
+                with open(failed_path, "r") as f:
+                    job = json.load(f)
+            except FileNotFoundError:
+                continue
+            for key in ("error", "worker", "claim"):
+                job.pop(key, None)
+            self._publish(job, self._path("pending", job_id))
+            os.remove(failed_path)
+            retried.append(job_id)
+        return retried